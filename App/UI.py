@@ -8,7 +8,8 @@ import sys; sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file_
 import matplotlib.pyplot as plt
 import networkx as nx
 from Simulate.Phase1_Find_Target_And_Driver_Nodes import find_driver_target_pairs
-from Simulate.Phase2_Multi_Beta_Simulate_Pair import simulate_from_driver_target_file, import_network
+from Simulate.Phase2_Multi_Beta_Simulate_Pair import simulate_from_driver_target_file
+from Simulate.Network_Loader import load_network
 from functions.Compare import match_with_oncokb_pubmed
 
 st.set_page_config(page_title="🎯 Multi-agent OCDM", layout="wide")
@@ -23,6 +24,10 @@ DELTA = st.sidebar.slider("Delta", 0.01, 1.0, 0.2, step=0.01)
 MAX_ITER = st.sidebar.number_input("Max Iterations", 10, 500, 50)
 TOL = st.sidebar.number_input("Tolerance", 1e-6, 1e-2, 1e-4, format="%e")
 N_BETA = st.sidebar.slider("Number of Beta per group", 1, 10, 2)
+ENGINE = st.sidebar.selectbox("Simulation engine", ["sparse", "frontier", "batched", "steady", "dense"])
+PRECISION = st.sidebar.selectbox("Precision", ["float64", "float32", "auto"])
+MEMORY_BUDGET_MB = st.sidebar.number_input("Memory budget per worker (MB, 0 = no limit)", 0, 65536, 0)
+N_JOBS = st.sidebar.number_input("Workers (0 = half of the cores)", 0, 256, 0)
 
 run_phase1 = st.sidebar.button("🔍 Run Phase 1", disabled=(uploaded_file is None))
 run_phase2 = st.sidebar.button("🚀 Run Phase 2", disabled=("pair_path" not in st.session_state))
@@ -35,16 +40,16 @@ if uploaded_file:
     temp_path = os.path.join("Temp_Upload", uploaded_file.name)
     with open(temp_path, "wb") as f:
         f.write(uploaded_file.getbuffer())
-    G = import_network(temp_path)
-    st.success(f"✅ Network loaded with {len(G.nodes())} nodes and {len(G.edges())} edges.")
+    net = load_network(temp_path)
+    st.success(f"✅ Network loaded with {net.n_nodes} nodes and {net.n_edges} edges.")
     st.session_state["temp_path"] = temp_path
-    st.session_state["graph"] = G
+    st.session_state["graph"] = net
 else:
     st.warning("⚠️ Please upload a network file.")
 
 # --- VẼ MẠNG ---
 if "graph" in st.session_state and st.button("🧠 Visualize Network"):
-    G = st.session_state["graph"]
+    G = st.session_state["graph"].to_networkx()
     pos = nx.spring_layout(G)
     plt.figure(figsize=(6, 4))
     nx.draw(G, pos, with_labels=True, node_size=200, font_size=8)
@@ -82,7 +87,11 @@ if run_phase2 and "pair_path" in st.session_state:
             DELTA=DELTA,
             MAX_ITER=MAX_ITER,
             TOL=TOL,
-            N_BETA=N_BETA
+            N_BETA=N_BETA,
+            engine=ENGINE,
+            precision=PRECISION,
+            memory_budget_mb=MEMORY_BUDGET_MB or None,
+            n_jobs=N_JOBS or None
         )
         st.session_state["result_df"] = result_df
 
@@ -0,0 +1,529 @@
+# ✅ Benchmark.py — Đo thời gian / bộ nhớ và kiểm tra tương đương cho Phase 1, Phase 2 và Compare
+# ✅ Workload: mạng có sẵn (Data/17KEGGSubMAX, data_1…data_4) + đồ thị scale-free có hướng tổng hợp (1k → 100k node).
+# ✅ - Phase 1: build_H_K_fast, compute_Y_fast, find_driver_nodes_fast (Phase1_Core.py);
+# ✅   chọn driver đo cả engine mặc định (heap) lẫn bản sort cũ, 2 kết quả phải trùng nhau; mạng nhỏ còn so
+# ✅   H / K, Y, driver với bản gốc (original_*: BFS networkx, Y so từng cặp, sort lại mỗi lượt);
+# ✅   data_k: driver lưu sẵn ở Output/driver_nodes_k phải phủ hết target của dòng đó
+# ✅ - Phase 2: mọi engine chạy trong tiến trình (simulate_block) ở tham số mặc định của UI và so với bản dense gốc
+# ✅   (simulate_one_alpha) trên mạng đủ nhỏ (mọi mạng KEGG), cả Total_Support lẫn trạng thái cuối (phải trùng
+# ✅   từng bit với sparse / frontier / batched); mạng lớn hơn so với "sparse"; steady cũng phải trùng Total_Support
+# ✅   (báo "fallback" khi điều kiện hội tụ loại mọi lượt giải trực tiếp);
+# ✅   data_k còn được so với kết quả lưu sẵn Output/output_multi_beta_Cluster (multi_Beta_Simulate_Pair)
+# ✅ - Compare: nạp bảng OncoKB / PubMed và match_with_oncokb_pubmed
+# ✅ Baseline (JSON) lưu thời gian + digest kết quả; chạy với --baseline sẽ báo lỗi (exit 1) khi chậm đi
+# ✅ quá ngưỡng hoặc kết quả khác.
+#
+# ✅ Ví dụ:
+#   python Simulate/Benchmark.py --suite quick --save-baseline bench_baseline.json
+#   python Simulate/Benchmark.py --suite quick --baseline bench_baseline.json -o bench.csv --plot scaling.png
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import glob
+import hashlib
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from ast import literal_eval
+import numpy as np
+import pandas as pd
+import networkx as nx
+from Simulate.Network_Loader import load_network
+from Simulate.Phase1_Core import build_H_K_fast, compute_Y_fast, find_driver_nodes_fast
+from Simulate.Phase2_Multi_Beta_Simulate_Pair import simulate_block, simulate_one_round
+from Simulate.Profiler import enable_profiling, disable_profiling, load_trace, trace_path
+from Simulate.Sparse_Engine import attach_betas, iterate_batch_to_convergence, simulate_one_round_sparse
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, "Data")
+OUTPUT_DIR = os.path.join(BASE_DIR, "Output")
+
+# ✅ Tham số Phase 2 khi so các engine: giá trị mặc định của App/UI.py (MAX_ITER / TOL đủ lớn để lệch làm tròn
+# ✅ giữa các engine kịp lan ra dấu Total_Support); kết quả lưu sẵn dùng tham số riêng của multi_Beta_Simulate_Pair.py
+EPSILON = 0.1
+DELTA = 0.2
+MAX_ITER = 50
+TOL = 1e-4
+N_BETA = 2
+
+ENGINES = ["sparse", "frontier", "batched", "steady"]
+EXACT_ENGINES = {"sparse", "frontier", "batched"}  # phải trùng từng giá trị với tham chiếu (dense gốc)
+# ✅ steady: cột giải trực tiếp chỉ được nhận khi chắc trùng dấu vòng lặp, còn lại lặp như batched ⇒ Total_Support
+# ✅ cũng phải trùng tham chiếu; báo "fallback" khi không cột nào được giải trực tiếp
+SYNTHETIC_SIZES = {"quick": [1000, 10000], "full": [1000, 10000, 100000]}
+TARGET_PERCENT = 5
+MAX_TARGETS = 200
+N_SYNTHETIC_DRIVERS = 20
+
+# ✅ Danh sách workload: (tên, đường dẫn mạng, chỉ số data_k hoặc None)
+# ✅ names: chỉ giữ workload có tên bắt đầu bằng 1 trong các tiền tố (đồ thị tổng hợp chỉ sinh khi được chọn)
+def list_workloads(suite, work_dir, seed=42, names=None):
+    selected = lambda name: not names or any(name.startswith(prefix) for prefix in names)
+    workloads = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "17KEGGSubMAX", "*.txt"))):
+        workloads.append(("kegg/" + os.path.splitext(os.path.basename(path))[0], path, None))
+    for k in ([1] if suite == "quick" else [1, 2, 3, 4]):
+        for path in sorted(glob.glob(os.path.join(DATA_DIR, f"data_{k}", "*.txt"))):
+            workloads.append((f"data_{k}", path, k))
+    workloads = [w for w in workloads if selected(w[0])]
+    for n in SYNTHETIC_SIZES[suite]:
+        if selected(f"sf_{n}"):
+            workloads.append((f"sf_{n}", synthetic_graph(n, work_dir, seed), None))
+    return workloads
+
+# ✅ Đồ thị scale-free có hướng (networkx.scale_free_graph), ghi ra .txt đúng định dạng đầu vào, dùng lại nếu đã có
+def synthetic_graph(n, work_dir, seed=42):
+    path = os.path.join(work_dir, f"sf_{n}_s{seed}.txt")
+    if os.path.exists(path):
+        return path
+    os.makedirs(work_dir, exist_ok=True)
+    G = nx.DiGraph(nx.scale_free_graph(n, seed=seed))
+    G.remove_edges_from(list(nx.selfloop_edges(G)))
+    rng = np.random.default_rng(seed)
+    edges = pd.DataFrame(list(G.edges()), columns=["Source", "Target"])
+    edges["Source"] = "N" + edges["Source"].astype(str)
+    edges["Target"] = "N" + edges["Target"].astype(str)
+    edges["Direction"] = 1
+    edges["Weight"] = np.round(rng.uniform(0.1, 1.0, len(edges)), 3)
+    tmp = path + ".tmp"
+    edges.to_csv(tmp, sep="\t", index=False)
+    os.replace(tmp, path)
+    return path
+
+# ✅ Chạy fn và đo wall time; memory=True thì chạy lại lần 2 dưới tracemalloc để lấy bộ nhớ đỉnh (MB)
+def measure(fn, memory=True):
+    t0 = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - t0
+    peak_mb = np.nan
+    if memory:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak_mb = (tracemalloc.get_traced_memory()[1] - base) / 2 ** 20
+        if started:
+            tracemalloc.stop()
+    return result, wall, peak_mb
+
+def digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _digest_H_K(H, K):
+    H_c = {src: {str(d): sorted(ts) for d, ts in H_src.items()} for src, H_src in H.items() if H_src}
+    K_c = {t: {src: ds for src, ds in K_t.items() if ds} for t, K_t in K.items()}
+    return digest([H_c, K_c])
+
+# ✅ Phase 1 bản gốc (trước tối ưu), làm chuẩn đối chiếu: BFS networkx từ từng nguồn, Y so chữ ký từng cặp,
+# ✅ chọn driver sắp xếp lại toàn bộ ứng viên mỗi lượt
+def original_build_H_K(G, target_nodes, max_depth=None):
+    nodes = list(G.nodes())
+    H = {src: {} for src in nodes}
+    K = {t: {src: [] for src in nodes} for t in target_nodes}
+    for src in nodes:
+        lengths = nx.single_source_shortest_path_length(G, src, cutoff=max_depth)
+        for tgt in target_nodes:
+            if tgt in lengths:
+                H[src].setdefault(lengths[tgt], set()).add(tgt)
+                K[tgt][src].append(lengths[tgt])
+    return H, K
+
+def original_compute_Y(H, K):
+    Y = {}
+    for src in H.keys():
+        reached = set()
+        for d in H[src]:
+            reached.update(H[src][d])
+        unique = []
+        for t in reached:
+            t_key = frozenset(K[t][src])
+            if all(frozenset(K[tt][src]) != t_key for tt in unique):
+                unique.append(t)
+        Y[src] = set(unique)
+    return Y
+
+def original_find_driver_nodes(Y, target_nodes):
+    driver = []
+    covered = set()
+    target_nodes = set(target_nodes)
+    candidates = list(Y.items())
+    while not target_nodes <= covered:
+        candidates.sort(key=lambda x: len(x[1] - covered), reverse=True)
+        node, influence = candidates.pop(0)
+        covered.update(influence - covered)
+        driver.append(node)
+    return driver
+
+# ✅ Trạng thái cuối của từng alpha (theo thứ tự node của G) sau mọi lượt beta: "dense" = simulate_one_round gốc,
+# ✅ "sparse" / "frontier" = simulate_one_round_sparse, "batched" = iterate_batch_to_convergence trên ma trận n×k.
+# ✅ Total_Support chỉ đếm dấu nên lệch làm tròn của kernel hiếm khi lộ ra; so trạng thái thì thấy ngay
+def final_states(engine, alphas, G, op, drivers):
+    nodes = list(G.nodes())
+    order = np.array([op.node_index[v] for v in nodes], dtype=np.int64)
+    if engine == "batched":
+        X = np.zeros((op.n, len(alphas)), dtype=op.dtype)
+        X[[op.node_index[a] for a in alphas], np.arange(len(alphas))] = 1
+        for i in range(0, len(drivers), N_BETA):
+            beta_group = drivers[i:i + N_BETA]
+            active = [j for j, a in enumerate(alphas) if a not in beta_group]
+            attach_idx, attach_count = attach_betas(op, beta_group)
+            iterate_batch_to_convergence(op, X, active, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL)
+        return [X[order, j] for j in range(len(alphas))]
+    states = []
+    for alpha in alphas:
+        if engine == "dense":
+            x = np.zeros(len(nodes))
+            x[nodes.index(alpha)] = 1
+        else:
+            x = np.zeros(op.n, dtype=op.dtype)
+            x[op.node_index[alpha]] = 1
+        for i in range(0, len(drivers), N_BETA):
+            beta_group = drivers[i:i + N_BETA]
+            if alpha in beta_group:
+                continue
+            if engine == "dense":
+                x = simulate_one_round(G, beta_group, alpha, x, EPSILON, DELTA, MAX_ITER, TOL)
+            else:
+                x = simulate_one_round_sparse(op, beta_group, x, EPSILON, DELTA, MAX_ITER, TOL, engine == "frontier")
+        states.append(x if engine == "dense" else x[order])
+    return states
+
+# ✅ Số (cột, lượt Beta) engine steady giải trực tiếp / tổng số, đếm từ trace convergence của 1 lần chạy lại
+# ✅ (mỗi cột ghi 1 bản ghi "steady" khi giải trực tiếp, "batched" khi đi đường lặp)
+def steady_solved(op, alphas, drivers):
+    previous = trace_path()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.jsonl")
+        enable_profiling(path)
+        try:
+            simulate_block(0, alphas, op, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, "steady")
+        finally:
+            disable_profiling()
+            if previous is not None:
+                enable_profiling(previous)
+        _, convergence = load_trace(path)
+    if convergence.empty:
+        return 0, 0
+    return int((convergence["engine"] == "steady").sum()), len(convergence)
+
+# ✅ Target / driver của dòng đầu trong file cặp lưu sẵn (Output/driver_nodes_k, dạng list repr)
+def stored_pairs(k):
+    files = glob.glob(os.path.join(OUTPUT_DIR, f"driver_nodes_{k}", "*_pairs.csv"))
+    if not files:
+        return None
+    return pd.read_csv(files[0])
+
+class BenchmarkRun:
+    def __init__(self, memory=True, max_alphas=40, phase1_max_nodes=20000, dense_max_nodes=500, seed=42,
+                 dense_max_alphas=5, original_max_nodes=2000):
+        self.memory = memory
+        self.max_alphas = max_alphas
+        self.phase1_max_nodes = phase1_max_nodes
+        self.dense_max_nodes = dense_max_nodes
+        self.dense_max_alphas = dense_max_alphas
+        self.original_max_nodes = original_max_nodes
+        self.seed = seed
+        self.records = []
+
+    def add(self, workload, net, stage, engine, wall, peak_mb, result_digest="", status="ok", note=""):
+        self.records.append({
+            "workload": workload, "n_nodes": net.n_nodes if net is not None else np.nan,
+            "n_edges": net.n_edges if net is not None else np.nan, "stage": stage, "engine": engine,
+            "wall_s": wall, "peak_mb": peak_mb, "digest": result_digest, "status": status, "note": note,
+        })
+        print(f"  {workload:<32} {stage:<22} {engine:<9} {wall:9.3f}s {peak_mb:9.1f}MB  {status} {note}")
+
+    # ✅ Phase 1 trên 1 mạng; trả về drivers để dùng cho Phase 2
+    def run_phase1(self, name, net, targets):
+        G = net.to_networkx()
+        (H, K), wall, mem = measure(lambda: build_H_K_fast(G, targets), self.memory)
+        H_K_digest = _digest_H_K(H, K)
+        self.add(name, net, "phase1.build_H_K", "reference", wall, mem, H_K_digest)
+        Y, wall, mem = measure(lambda: compute_Y_fast(H, K), self.memory)
+        Y_digest = digest({src: sorted(ys) for src, ys in Y.items() if ys})
+        self.add(name, net, "phase1.compute_Y", "reference", wall, mem, Y_digest)
+        drivers, wall, mem = measure(lambda: find_driver_nodes_fast(Y, targets), self.memory)
+        self.add(name, net, "phase1.find_drivers", "reference", wall, mem, digest(drivers))
+        # Bản sort cũ: phải chọn cùng driver, cùng thứ tự; ghi chú tốc độ so với engine mặc định (heap)
+        sorted_drivers, sort_wall, mem = measure(lambda: find_driver_nodes_fast(Y, targets, engine="sort"),
+                                                 self.memory)
+        status = "ok" if sorted_drivers == drivers else "FAIL"
+        self.add(name, net, "phase1.find_drivers", "sort", sort_wall, mem, digest(sorted_drivers), status,
+                 f"heap nhanh hơn ×{sort_wall / wall:.1f}" if wall > 0 else "")
+        if net.n_nodes <= self.original_max_nodes:
+            self.run_phase1_original(name, net, G, targets, H_K_digest, Y_digest, drivers)
+        return drivers
+
+    # ✅ Bản gốc trên cùng target: H / K, Y và driver (kể cả thứ tự) phải trùng bản đang dùng
+    def run_phase1_original(self, name, net, G, targets, H_K_digest, Y_digest, drivers):
+        (H, K), wall, _ = measure(lambda: original_build_H_K(G, targets), False)
+        got = _digest_H_K(H, K)
+        self.add(name, net, "phase1.build_H_K", "original", wall, np.nan, got,
+                 "ok" if got == H_K_digest else "FAIL", "" if got == H_K_digest else "H / K khác bản gốc")
+        Y, wall, _ = measure(lambda: original_compute_Y(H, K), False)
+        got = digest({src: sorted(ys) for src, ys in Y.items() if ys})
+        self.add(name, net, "phase1.compute_Y", "original", wall, np.nan, got,
+                 "ok" if got == Y_digest else "FAIL", "" if got == Y_digest else "Y khác bản gốc")
+        original, wall, _ = measure(lambda: original_find_driver_nodes(Y, targets), False)
+        self.add(name, net, "phase1.find_drivers", "original", wall, np.nan, digest(original),
+                 "ok" if original == drivers else "FAIL", "" if original == drivers else "driver khác bản gốc")
+
+    # ✅ data_k: driver lưu sẵn (Output/driver_nodes_k) chạy với hash seed không rõ nên không so từng phần tử
+    # ✅ (đại diện trong Y phụ thuộc thứ tự duyệt set); kiểm tra điều không phụ thuộc seed: mọi target của dòng
+    # ✅ đều tới được từ ít nhất 1 driver lưu sẵn
+    def run_stored_drivers(self, name, net, targets, stored_drivers):
+        G = net.to_networkx()
+        stored_drivers = [d for d in stored_drivers if d in G]
+        (H, _), wall, mem = measure(lambda: build_H_K_fast(G, targets), self.memory)
+        reached = set()
+        for d in stored_drivers:
+            for ts in H[d].values():
+                reached.update(ts)
+        missing = len(set(targets) - reached)
+        self.add(name, net, "phase1.stored_drivers", "reference", wall, mem, digest(sorted(stored_drivers)),
+                 "ok" if missing == 0 else "FAIL",
+                 f"{missing}/{len(set(targets))} target không tới được từ driver lưu sẵn" if missing else "")
+
+    # ✅ Phase 2: mọi engine trên cùng 1 khối alpha; tham chiếu là bản dense gốc (simulate_one_alpha) trên
+    # ✅ dense_max_alphas alpha đầu khi mạng đủ nhỏ, không thì engine "sparse"
+    def run_phase2(self, name, net, alphas, drivers):
+        op = net.operator()
+        reference, reference_engine = None, None
+        if net.n_nodes <= self.dense_max_nodes:
+            reference_alphas = alphas[:self.dense_max_alphas]
+            G = net.to_networkx()
+            run = lambda: simulate_block(0, reference_alphas, G, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA,
+                                         "dense")[1]
+            pairs, wall, _ = measure(run, False)
+            reference, reference_engine = [s for _, s in pairs], "dense"
+            self.add(name, net, "phase2.simulate", "dense", wall, np.nan, digest(reference),
+                     note=f"tham chiếu, {len(reference_alphas)} alpha")
+            self.run_phase2_states(name, net, [a for a in reference_alphas if a in G], G, op, drivers)
+        for engine in ENGINES:
+            run = lambda: simulate_block(0, alphas, op, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, engine)[1]
+            pairs, wall, mem = measure(run, self.memory)
+            supports = [s for _, s in pairs]
+            if reference is None:
+                reference, reference_engine = supports, engine
+                self.add(name, net, "phase2.simulate", engine, wall, mem, digest(supports), note="tham chiếu")
+                continue
+            compared = list(zip(supports, reference))
+            mismatch = sum(a != b for a, b in compared)
+            status = "ok" if mismatch == 0 else "FAIL"
+            notes = [f"{mismatch}/{len(compared)} khác {reference_engine}"] if mismatch else []
+            if engine == "steady":
+                solved, total = steady_solved(op, alphas, drivers)
+                if solved == 0 and mismatch == 0:
+                    status = "fallback"
+                notes.append(f"giải trực tiếp {solved}/{total} cột-lượt")
+            self.add(name, net, "phase2.simulate", engine, wall, mem, digest(supports), status, ", ".join(notes))
+
+    # ✅ Engine chính xác phải cho trạng thái cuối trùng từng bit với bản dense gốc
+    def run_phase2_states(self, name, net, alphas, G, op, drivers):
+        reference = final_states("dense", alphas, G, op, drivers)
+        for engine in sorted(EXACT_ENGINES):
+            states, wall, _ = measure(lambda: final_states(engine, alphas, G, op, drivers), False)
+            mismatch = sum(not np.array_equal(a, b) for a, b in zip(states, reference))
+            gap = max(float(np.max(np.abs(a - b))) for a, b in zip(states, reference)) if states else 0.0
+            self.add(name, net, "phase2.state", engine, wall, np.nan, hashlib.sha1(b"".join(s.tobytes() for s in states)).hexdigest()[:16],
+                     "ok" if mismatch == 0 else "FAIL",
+                     f"{mismatch}/{len(states)} trạng thái khác dense (lệch tối đa {gap:.3g})" if mismatch else "")
+
+    # ✅ data_k: tái tạo vài alpha của kết quả lưu sẵn bằng multi_Beta_Simulate_Pair (engine CSR)
+    def run_stored_reference(self, name, net, path, pairs_df):
+        from Simulate import multi_Beta_Simulate_Pair as multi_beta
+        stored_file = os.path.join(OUTPUT_DIR, "output_multi_beta_Cluster",
+                                   os.path.splitext(os.path.basename(path))[0] + "_cpu_result.csv")
+        if not os.path.exists(stored_file) or pairs_df is None:
+            return
+        stored = pd.read_csv(stored_file)
+        targets = literal_eval(pairs_df["Target_Nodes"].iloc[0])[:self.max_alphas]
+        drivers = literal_eval(pairs_df["Driver_Nodes"].iloc[0])
+        G = net.to_networkx()
+        results, wall, mem = measure(lambda: multi_beta.process_target_driver(G, targets, drivers), self.memory)
+        got = [r["Total_Support"] for r in results]
+        want = stored["Total_Support"].iloc[:len(targets)].tolist()
+        mismatch = sum(a != b for a, b in zip(got, want))
+        self.add(name, net, "phase2.stored_reference", multi_beta.ENGINE, wall, mem, digest(got),
+                 "ok" if mismatch == 0 else "FAIL", f"{mismatch}/{len(targets)} khác Output/" if mismatch else "")
+
+    def run_workload(self, name, path, k):
+        net, wall, mem = measure(lambda: load_network(path, use_cache=False), self.memory)
+        self.add(name, net, "load.parse", "pandas", wall, mem, digest([net.n_nodes, net.n_edges]))
+        net = load_network(path)
+
+        nodes = net.node_order()
+        rng = random.Random(self.seed)
+        pairs_df = stored_pairs(k) if k is not None else None
+        if pairs_df is not None:
+            node_set = set(nodes)
+            targets = [t for t in literal_eval(pairs_df["Target_Nodes"].iloc[0]) if t in node_set]
+            drivers = literal_eval(pairs_df["Driver_Nodes"].iloc[0])
+        else:
+            d = min(MAX_TARGETS, max(1, TARGET_PERCENT * len(nodes) // 100))
+            targets = rng.sample(nodes, d)
+            drivers = None
+
+        if pairs_df is not None:
+            self.run_stored_drivers(name, net, targets, drivers)
+        if net.n_nodes <= self.phase1_max_nodes:
+            drivers = self.run_phase1(name, net, targets)
+        if drivers is None:
+            target_set = set(targets)
+            others = [v for v in nodes if v not in target_set]
+            drivers = rng.sample(others, min(N_SYNTHETIC_DRIVERS, len(others)))
+        self.run_phase2(name, net, targets[:self.max_alphas], drivers)
+        if k is not None:
+            self.run_stored_reference(name, net, path, pairs_df)
+
+    # ✅ Compare.py: nạp bảng tham chiếu + đối chiếu top_n gen của 1 kết quả lưu sẵn
+    def run_compare(self, top_n=200):
+        stored_file = os.path.join(OUTPUT_DIR, "output_multi_beta_Cluster", "Human cancer signaling - Input_cpu_result.csv")
+        if not os.path.exists(stored_file):
+            return
+        t0 = time.perf_counter()
+        from functions import Compare
+        Compare.load_reference()  # nạp lười: đọc bảng (snapshot hoặc file gốc) + dựng chỉ mục ở đây
+        self.add("compare", None, "compare.load_reference", "reference", time.perf_counter() - t0, np.nan)
+        df = pd.read_csv(stored_file)
+        out, wall, mem = measure(lambda: Compare.match_with_oncokb_pubmed(df, top_n=top_n), self.memory)
+        self.add("compare", None, "compare.match", "reference", wall, mem,
+                 digest(out.astype(str).values.tolist()), note=f"top_n={top_n}")
+
+    def frame(self):
+        return pd.DataFrame(self.records)
+
+def _key(record):
+    return f"{record['workload']}|{record['stage']}|{record['engine']}"
+
+def save_baseline(df, path):
+    baseline = {_key(r): {"wall_s": r["wall_s"], "peak_mb": r["peak_mb"], "digest": r["digest"]}
+                for r in df.to_dict("records")}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=1, default=float)
+
+# ✅ So với baseline: chậm hơn (1 + tolerance) lần và hơn min_seconds giây, hoặc digest khác → lỗi
+def check_baseline(df, path, tolerance=0.25, min_seconds=0.05):
+    with open(path) as f:
+        baseline = json.load(f)
+    problems = []
+    for r in df.to_dict("records"):
+        base = baseline.get(_key(r))
+        if base is None:
+            continue
+        if base["digest"] and r["digest"] and base["digest"] != r["digest"]:
+            problems.append(f"{_key(r)}: kết quả khác baseline ({r['digest']} != {base['digest']})")
+        limit = base["wall_s"] * (1 + tolerance)
+        if r["wall_s"] > limit and r["wall_s"] - base["wall_s"] > min_seconds:
+            problems.append(f"{_key(r)}: {r['wall_s']:.3f}s > {base['wall_s']:.3f}s × {1 + tolerance:g}")
+    return problems
+
+# ✅ Đường cong tăng trưởng trên các đồ thị tổng hợp: thời gian / bộ nhớ theo số node + hệ số mũ (log-log)
+def scaling_table(df):
+    synth = df[df["workload"].str.startswith("sf_")]
+    if synth.empty:
+        return pd.DataFrame()
+    rows = []
+    for (stage, engine), g in synth.groupby(["stage", "engine"]):
+        g = g.sort_values("n_nodes")
+        row = {"stage": stage, "engine": engine}
+        for n, wall, mem in zip(g["n_nodes"], g["wall_s"], g["peak_mb"]):
+            row[f"wall_s@{int(n)}"] = wall
+            row[f"peak_mb@{int(n)}"] = mem
+        ok = g["wall_s"] > 0
+        row["time_exponent"] = (np.polyfit(np.log(g["n_nodes"][ok]), np.log(g["wall_s"][ok]), 1)[0]
+                                if ok.sum() >= 2 else np.nan)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def plot_scaling(df, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    synth = df[df["workload"].str.startswith("sf_")]
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for (stage, engine), g in synth.groupby(["stage", "engine"]):
+        g = g.sort_values("n_nodes")
+        axes[0].plot(g["n_nodes"], g["wall_s"], marker="o", label=f"{stage} [{engine}]")
+        axes[1].plot(g["n_nodes"], g["peak_mb"], marker="o", label=f"{stage} [{engine}]")
+    for ax, ylabel in zip(axes, ["wall time (s)", "peak memory (MB)"]):
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("nodes")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, which="both", alpha=0.3)
+    axes[0].legend(fontsize=7)
+    fig.tight_layout()
+    fig.savefig(path)
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark + kiểm tra tương đương Phase 1 / Phase 2 / Compare")
+    parser.add_argument("--suite", default="quick", choices=["quick", "full"],
+                        help="quick: KEGG + data_1 + scale-free 1k/10k; full: + data_2..4 + scale-free 100k")
+    parser.add_argument("--workloads", nargs="*", default=None, help="chỉ chạy các workload có tên bắt đầu bằng ...")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "ocdm_benchmark"),
+                        help="nơi lưu đồ thị tổng hợp")
+    parser.add_argument("--max-alphas", type=int, default=40, help="số alpha mỗi workload ở Phase 2")
+    parser.add_argument("--phase1-max-nodes", type=int, default=20000)
+    parser.add_argument("--dense-max-nodes", type=int, default=500, help="mạng lớn hơn không chạy tham chiếu dense")
+    parser.add_argument("--dense-max-alphas", type=int, default=5, help="số alpha chạy tham chiếu dense mỗi mạng")
+    parser.add_argument("--original-max-nodes", type=int, default=2000,
+                        help="mạng lớn hơn không chạy Phase 1 bản gốc để đối chiếu")
+    parser.add_argument("--no-memory", action="store_true", help="bỏ lần chạy đo bộ nhớ (tracemalloc)")
+    parser.add_argument("--skip-compare", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default=None, help="CSV kết quả từng phép đo")
+    parser.add_argument("--plot", default=None, help="ảnh đường cong tăng trưởng (cần matplotlib)")
+    parser.add_argument("--baseline", default=None, help="baseline JSON để phát hiện chậm đi / kết quả khác")
+    parser.add_argument("--save-baseline", default=None, help="ghi baseline JSON từ lần chạy này")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    # ✅ Thứ tự duyệt set trong Phase 1 phụ thuộc hash chuỗi: cố định để digest ổn định giữa các lần chạy
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    args = _parse_args()
+    bench = BenchmarkRun(memory=not args.no_memory, max_alphas=args.max_alphas,
+                         phase1_max_nodes=args.phase1_max_nodes, dense_max_nodes=args.dense_max_nodes, seed=args.seed,
+                         dense_max_alphas=args.dense_max_alphas, original_max_nodes=args.original_max_nodes)
+    for name, path, k in list_workloads(args.suite, args.work_dir, args.seed, args.workloads):
+        print(f"\n📊 {name}")
+        bench.run_workload(name, path, k)
+    if not args.skip_compare and (not args.workloads or any("compare".startswith(w) for w in args.workloads)):
+        print("\n📊 compare")
+        bench.run_compare()
+
+    df = bench.frame()
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"\n✅ Đã lưu {len(df)} phép đo vào {args.output}")
+    scaling = scaling_table(df)
+    if not scaling.empty:
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print("\n📈 Tăng trưởng trên đồ thị scale-free:")
+            print(scaling.to_string(index=False))
+    if args.plot:
+        plot_scaling(df, args.plot)
+        print(f"✅ Đã lưu biểu đồ {args.plot}")
+    if args.save_baseline:
+        save_baseline(df, args.save_baseline)
+        print(f"✅ Đã lưu baseline {args.save_baseline}")
+
+    failures = [f"{_key(r)}: {r['note']}" for r in df.to_dict("records") if r["status"] == "FAIL"]
+    if args.baseline:
+        failures += check_baseline(df, args.baseline, args.tolerance)
+    if failures:
+        print("\n❌ Lỗi:")
+        for line in failures:
+            print("  - " + line)
+        sys.exit(1)
+    print("\n✅ Không có sai khác / chậm đi")
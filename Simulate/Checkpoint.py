@@ -0,0 +1,96 @@
+# ✅ Checkpoint.py — Ghi kết quả Phase 2 theo từng (dòng, alpha) ngay khi xong, cho phép chạy tiếp sau sự cố
+# ✅ File kết quả chỉ ghi nối (append-only), tên file gắn với hash của (mạng, file cặp, tham số):
+# ✅ chạy lại cùng đầu vào sẽ bỏ qua các (dòng, alpha) đã có; compact_results ra bảng Alpha_Node, Total_Support.
+
+import csv
+import hashlib
+import json
+import os
+import pandas as pd
+from Simulate.Network_Loader import file_hash
+
+PARTS_HEADER = ["Row", "Alpha_Node", "Total_Support"]
+
+# ✅ Khoá của 1 lần chạy: nội dung mạng + nội dung file cặp + tham số mô phỏng
+def run_key(graph_path, pair_csv_path, params):
+    h = hashlib.sha1()
+    h.update(file_hash(graph_path).encode())
+    h.update(file_hash(pair_csv_path).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+# ✅ label: phân biệt các shard của cùng 1 lần chạy (Sharding.py), ví dụ "s000-of-004"
+def checkpoint_path(checkpoint_dir, graph_path, pair_csv_path, params, label=None):
+    base = os.path.splitext(os.path.basename(pair_csv_path))[0]
+    key = run_key(graph_path, pair_csv_path, params)
+    suffix = f".{label}" if label else ""
+    return os.path.join(checkpoint_dir, f"{base}_{key}{suffix}.parts.csv")
+
+def _parse_parts(text):
+    done = {}
+    rows = csv.reader(text.splitlines())
+    next(rows, None)
+    for row, alpha, support in rows:
+        done[(int(row), alpha)] = int(support) if support != "" else None
+    return done
+
+# ✅ Chỉ đọc file kết quả từng phần (không sửa file; dòng ghi dở ở cuối bị bỏ qua)
+def read_parts(path):
+    with open(path, newline="") as f:
+        text = f.read()
+    return _parse_parts(text[:text.rfind("\n") + 1])
+
+# ✅ File kết quả từng phần (append-only)
+class ResultCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._done = self._load()
+        self._file = open(path, "a", newline="")
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(PARTS_HEADER)
+            self._file.flush()
+
+    # Chỉ nhận các dòng kết thúc bằng xuống dòng: dòng ghi dở lúc sập máy bị cắt khỏi file
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, newline="") as f:
+            text = f.read()
+        if text and not text.endswith("\n"):
+            text = text[:text.rfind("\n") + 1]
+            with open(self.path, "w", newline="") as f:
+                f.write(text)
+        return _parse_parts(text)
+
+    def done(self):
+        return self._done
+
+    # ✅ Ghi 1 kết quả (support=None: alpha không có trong mạng, vẫn đánh dấu là đã xử lý)
+    def append(self, row, alpha, support):
+        self._done[(row, alpha)] = support
+        self._writer.writerow([row, alpha, "" if support is None else support])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# ✅ Gom kết quả theo đúng thứ tự dòng / alpha của file cặp (giống kết quả chạy 1 lèo)
+def compact_results(done, rows):
+    output = []
+    for row_idx, targets in rows:
+        for alpha in targets:
+            support = done.get((row_idx, alpha))
+            if support is not None:
+                output.append({"Alpha_Node": alpha, "Total_Support": support})
+    return pd.DataFrame(output, columns=["Alpha_Node", "Total_Support"])
+
+# ✅ Đọc file từng phần đã có và xuất ra CSV Alpha_Node, Total_Support
+def compact_checkpoint(parts_path, rows, output_csv=None):
+    df = compact_results(read_parts(parts_path), rows)
+    if output_csv:
+        df.to_csv(output_csv, index=False)
+    return df
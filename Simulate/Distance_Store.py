@@ -0,0 +1,221 @@
+# ✅ Distance_Store.py — Ma trận khoảng cách target × nguồn (int16/int32, -1 = không tới được) cho Phase 1
+# ✅ Thay cho K = {t: {src: [d]}} (|T|×|V| list Python): H và K chỉ là view đọc trên cùng 1 mảng numpy,
+# ✅ compute_Y_fast / find_driver_nodes_fast truy vấn trực tiếp qua distance() / column() / reached().
+# ✅ DistanceIndex: khoảng cách tới các target đã gặp của 1 mạng lưu trên đĩa (mỗi target 1 hàng, file ghi nối đuôi
+# ✅ trong thư mục cache .ocdm, đọc bằng memory-map), mỗi vòng chọn target / nhóm bệnh / lần chạy sau chỉ cắt
+# ✅ các hàng cần dùng; bộ nhớ / đĩa tỉ lệ với |T|×|V| chứ không phải |V|×|V|.
+
+import os
+from collections.abc import Mapping
+import numpy as np
+from Simulate.Network_Loader import load_network, file_hash, _cache_dir
+from Simulate.Shared_Graph import bfs_distances
+from Simulate.Profiler import stage
+
+UNREACHABLE = -1
+ROWS_FILE = "distance_rows.bin"
+SLOT_FILE = "distance_slots.npy"
+LEGACY_FILES = ("distances.npy", "distances_done.npy")  # bản cũ: ma trận |V|×|V| + cờ đã tính
+
+# ✅ int16 đủ khi mọi khoảng cách (≤ n-1) vừa kiểu; mạng lớn hơn dùng int32
+def distance_dtype(n_nodes):
+    return np.int16 if n_nodes <= np.iinfo(np.int16).max else np.int32
+
+class TargetDistances:
+    """
+    D[i, j] = độ dài đường ngắn nhất nodes[j] → targets[i], UNREACHABLE nếu không tới được.
+    targets giữ nguyên thứ tự (kể cả phần tử trùng) như danh sách target truyền vào build_H_K_fast.
+    """
+    def __init__(self, nodes, targets, D):
+        self.nodes = list(nodes)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.targets = list(targets)
+        self.D = D
+        self.target_rows = {}
+        for i, t in enumerate(self.targets):
+            self.target_rows.setdefault(t, []).append(i)
+        self.H = HView(self)
+        self.K = KView(self)
+
+    @property
+    def nbytes(self):
+        return self.D.nbytes
+
+    # ✅ Cột khoảng cách của 1 nguồn (theo thứ tự targets)
+    def column(self, src):
+        return self.D[:, self.node_index[src]]
+
+    # ✅ Vị trí target (trong self.targets) mà src tới được, theo thứ tự targets
+    def reached(self, src):
+        return np.flatnonzero(self.column(src) != UNREACHABLE)
+
+    # ✅ Khoảng cách src → t (None nếu không tới được)
+    def distance(self, t, src):
+        d = int(self.D[self.target_rows[t][0], self.node_index[src]])
+        return None if d == UNREACHABLE else d
+
+# ✅ H[src] = {d: tập target cách src đúng d bước}, dựng khi truy cập (thứ tự khoá / phần tử như bản dict)
+class HView(Mapping):
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, src):
+        store = self.store
+        col = store.column(src)
+        H_src = {}
+        for i in np.flatnonzero(col != UNREACHABLE).tolist():
+            H_src.setdefault(int(col[i]), set()).add(store.targets[i])
+        return H_src
+
+    def __iter__(self):
+        return iter(self.store.nodes)
+
+    def __len__(self):
+        return len(self.store.nodes)
+
+    def __contains__(self, src):
+        return src in self.store.node_index
+
+# ✅ K[t][src] = [d] (lặp lại theo số lần t xuất hiện trong targets, [] nếu không tới được) như bản dict
+class KView(Mapping):
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, t):
+        if t not in self.store.target_rows:
+            raise KeyError(t)
+        return _KRow(self.store, t)
+
+    def __iter__(self):
+        return iter(self.store.target_rows)
+
+    def __len__(self):
+        return len(self.store.target_rows)
+
+    def __contains__(self, t):
+        return t in self.store.target_rows
+
+class _KRow(Mapping):
+    def __init__(self, store, t):
+        self.store = store
+        self.rows = store.target_rows[t]
+
+    def __getitem__(self, src):
+        d = int(self.store.D[self.rows[0], self.store.node_index[src]])
+        return [] if d == UNREACHABLE else [d] * len(self.rows)
+
+    def __iter__(self):
+        return iter(self.store.nodes)
+
+    def __len__(self):
+        return len(self.store.nodes)
+
+    def __contains__(self, src):
+        return src in self.store.node_index
+
+# ✅ Mở mảng .npy bằng memory-map (tạo mới nếu chưa có / sai kích thước; file mới là file thưa trên đĩa)
+def _open_array(path, shape, dtype, reuse=True):
+    if reuse and os.path.exists(path):
+        try:
+            arr = np.load(path, mmap_mode="r+")
+            if arr.shape == shape and arr.dtype == dtype:
+                return arr, False
+        except (OSError, ValueError):
+            pass
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape), True
+
+class DistanceIndex:
+    """
+    Hàng của target t: D[src] = độ dài đường ngắn nhất src → t trên toàn mạng (UNREACHABLE nếu không tới được).
+    Hàng chỉ tính (1 BFS ngược) lần đầu t được hỏi, rồi nối vào kho hàng; slot[t] = vị trí hàng của t
+    (-1 = chưa tính). Mở bằng DistanceIndex.open(file_mạng): kho hàng (ROWS_FILE, chỉ ghi nối đuôi) và slot
+    được ghi cạnh cache .ocdm của mạng và dùng lại ở lần chạy sau; thư mục chỉ đọc thì giữ trong bộ nhớ.
+    """
+    def __init__(self, net, folder=None):
+        self.net = net
+        self.nodes = net.node_order()
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        n = len(self.nodes)
+        self.dtype = np.dtype(distance_dtype(n))
+        self.rows = np.empty((0, n), dtype=self.dtype)
+        self.slot = None
+        self._rows_path = None
+        if folder is not None:
+            try:
+                self._open_folder(folder)
+            except OSError:
+                self.slot, self._rows_path = None, None
+                self.rows = np.empty((0, n), dtype=self.dtype)
+        if self.slot is None:
+            self.slot = np.full(n, -1, dtype=np.int32)
+        self._M = None
+
+    def _open_folder(self, folder):
+        n = len(self.nodes)
+        for name in LEGACY_FILES:
+            if os.path.exists(os.path.join(folder, name)):
+                os.remove(os.path.join(folder, name))
+        rows_path = os.path.join(folder, ROWS_FILE)
+        row_bytes = max(1, n * self.dtype.itemsize)
+        count = os.path.getsize(rows_path) // row_bytes if os.path.exists(rows_path) else 0
+        slot, created = _open_array(os.path.join(folder, SLOT_FILE), (n,), np.dtype(np.int32))
+        if created:
+            count = 0
+            slot[:] = -1
+        else:
+            # Hàng ghi dở (dừng giữa chừng) thì slot không được trỏ tới
+            slot[slot >= count] = -1
+        with open(rows_path, "ab") as f:
+            f.truncate(count * row_bytes)  # bỏ phần hàng ghi dở ở cuối file
+        slot.flush()
+        self.slot, self._rows_path = slot, rows_path
+        self._map_rows(count)
+
+    def _map_rows(self, count):
+        if count and len(self.nodes):
+            self.rows = np.memmap(self._rows_path, dtype=self.dtype, mode="r", shape=(count, len(self.nodes)))
+        else:
+            self.rows = np.empty((count, len(self.nodes)), dtype=self.dtype)
+
+    # ✅ Nối các hàng mới vào kho hàng (file trên đĩa hoặc mảng trong bộ nhớ), trả về vị trí hàng đầu tiên
+    def _append(self, block):
+        start = len(self.rows)
+        if self._rows_path is None:
+            self.rows = np.concatenate((self.rows, block))
+        else:
+            with open(self._rows_path, "ab") as f:
+                f.write(block.tobytes())
+            self._map_rows(start + len(block))
+        return start
+
+    @classmethod
+    def open(cls, file_path):
+        net = load_network(file_path)
+        folder = _cache_dir(file_path, file_hash(file_path))
+        return cls(net, folder if os.path.isdir(folder) else None)
+
+    # ✅ Tính (và ghi xuống đĩa) các hàng target chưa có
+    def ensure(self, target_idx):
+        missing = [t for t in dict.fromkeys(int(t) for t in target_idx) if self.slot[t] < 0]
+        if not missing:
+            return 0
+        if self._M is None:
+            self._M = self.net.operator().M  # hàng u = node nhận → BFS trên M đi ngược chiều cạnh
+        with stage("phase1.distance_index", computed=len(missing)):
+            block = np.empty((len(missing), len(self.nodes)), dtype=self.dtype)
+            for k, t in enumerate(missing):
+                block[k] = bfs_distances(self._M, t)
+            start = self._append(block)
+            self.slot[missing] = np.arange(start, start + len(missing))  # chỉ trỏ tới sau khi hàng đã ghi xong
+            if isinstance(self.slot, np.memmap):
+                self.slot.flush()
+        return len(missing)
+
+    # ✅ Ma trận khoảng cách cho 1 tập target (giữ thứ tự / phần tử trùng), cắt theo max_depth nếu có
+    def slice(self, target_nodes, max_depth=None):
+        target_idx = [self.node_index[t] for t in target_nodes]
+        self.ensure(target_idx)
+        D = np.array(self.rows[self.slot[target_idx]])
+        if max_depth is not None:
+            D[D > max_depth] = UNREACHABLE
+        return TargetDistances(self.nodes, target_nodes, D)
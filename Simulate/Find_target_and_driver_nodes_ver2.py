@@ -3,110 +3,53 @@
 
 import networkx as nx
 import numpy as np
-from tqdm import tqdm
 import random
-from joblib import Parallel, delayed, cpu_count
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import pandas as pd
+from Simulate.Distance_Store import DistanceIndex
+from Simulate.Network_Loader import import_network  # ✅ Hàm đọc mạng dùng chung (có cache)
+from Simulate.Phase1_Core import compute_Y_fast, find_driver_nodes_fast  # ✅ Lõi Phase 1 dùng chung
+from Simulate.Scheduler import WorkScheduler  # ✅ Pool worker dùng chung cho các nhóm bệnh
+from Simulate.Profiler import stage, attach_trace, trace_path  # ✅ Đo từng giai đoạn khi đặt OCDM_PROFILE=trace.jsonl
 
 # ✅ Cố định seed để kết quả nhất quán mỗi lần chạy
 random.seed(42)
 np.random.seed(42)
 
-def import_network(file_path):
-    """
-    ✅ Đọc mạng từ file txt, định dạng: Source, Target, Direction, Weight
-    Nếu Direction == 1: cạnh thuận chiều.
-    Nếu Direction == 0: cạnh hai chiều.
-    """
-    with open(file_path, "r") as f:
-        data = f.readlines()[1:]
-    G = nx.DiGraph()
-    for line in data:
-        from_node, to_node, direction, weight = line.strip().split("\t")
-        direction = int(direction)
-        weight = float(weight)
-        G.add_edge(from_node, to_node, weight=weight)
-        if direction == 0:
-            G.add_edge(to_node, from_node, weight=weight)
-    return G
-
-def select_target_nodes_non_overlap(G: nx.DiGraph, percent, excluded_nodes):
-    nodes = list(set(G.nodes()) - excluded_nodes)
-    d = int(percent * len(G.nodes()) / 100)
-
-    # ✅ Nếu số node còn lại < d thì chọn hết phần còn lại
-    if len(nodes) <= d:
-        return nodes
-
-    # ✅ Ngược lại chọn bình thường nhưng đảm bảo liên thông
-    max_trials = 1000  # Tránh lặp vô hạn
-    for _ in range(max_trials):
-        start = random.choice(nodes)
-        reachable = set(nx.descendants(G, start)) | {start}
-        reachable = reachable - excluded_nodes
-        if len(reachable) >= d:
-            selected = list(reachable)[:d]
-            return selected
-
-    # ✅ Nếu không tìm được thành phần liên thông đủ lớn thì dừng
-    print("⚠️ Không còn thành phần liên thông đủ lớn, dừng việc chọn target node!")
-    return []
-
-def _process_single_source(src, G, target_nodes, max_depth):
-    lengths = nx.single_source_shortest_path_length(G, src, cutoff=max_depth)
-    H_src = {}
-    K_update = []
-    for tgt in target_nodes:
-        if tgt in lengths:
-            dist = lengths[tgt]
-            H_src.setdefault(dist, set()).add(tgt)
-            K_update.append((tgt, src, dist))
-    return src, H_src, K_update
-
-def build_H_K_fast(G: nx.DiGraph, target_nodes, max_depth=None):
-    nodes = list(G.nodes())
-    n_cores = max(1, cpu_count() // 2)
-    results = Parallel(n_jobs=n_cores)(
-        delayed(_process_single_source)(src, G, target_nodes, max_depth)
-        for src in tqdm(nodes, desc="Parallel BFS")
-    )
-    H = {src: {} for src in nodes}
-    K = {t: {src: [] for src in nodes} for t in target_nodes}
-    for src, H_src, K_updates in results:
-        H[src] = H_src
-        for tgt, s, d in K_updates:
-            K[tgt][s].append(d)
-    return H, K
+# ✅ Chạy gộp mọi nhóm bệnh trên cùng 1 mạng: BFS ngược chỉ cho hợp các target (mỗi target 1 lần, giữ trong
+# ✅ DistanceIndex), mỗi bệnh chỉ cắt hàng khoảng cách của mình; Y + chọn driver của các bệnh chạy song song.
+def _disease_drivers(disease, store, trace=None):
+    attach_trace(trace)
+    with stage("phase1.disease", disease=disease, n_targets=len(store.targets)):
+        with stage("phase1.compute_Y"):
+            Y = compute_Y_fast(store.H, store.K)
+        with stage("phase1.find_drivers"):
+            drivers = find_driver_nodes_fast(Y, store.targets)
+    return disease, drivers
+
+# ✅ Trả về {bệnh: (drivers, valid_targets)} theo thứ tự disease_groups (bỏ bệnh không có target trong mạng)
+def find_drivers_for_diseases(G: nx.DiGraph, disease_groups, index, n_jobs=None):
+    valid = {}
+    for disease, target_nodes in disease_groups.items():
+        # ✅ Kiểm tra target nodes có trong mạng không
+        valid_targets = [node for node in target_nodes if node in G]
+        if not valid_targets:
+            print(f"⚠️ Không có target node nào trong mạng cho bệnh: {disease}")
+            continue
+        valid[disease] = valid_targets
 
-def compute_Y_fast(H, K):
-    Y = {}
-    for src in tqdm(H.keys(), desc="Computing Y sets"):
-        reached = set()
-        for d in H[src]:
-            reached.update(H[src][d])
-        unique = []
-        for t in reached:
-            t_key = frozenset(K[t][src])
-            if all(frozenset(K[tt][src]) != t_key for tt in unique):
-                unique.append(t)
-        Y[src] = set(unique)
-    return Y
+    union = dict.fromkeys(t for targets in valid.values() for t in targets)
+    with stage("phase1.build_H_K", n_targets=len(union), n_diseases=len(valid)):
+        index.ensure([index.node_index[t] for t in union])
 
-def find_driver_nodes_fast(Y, target_nodes):
-    driver = []
-    covered = set()
-    target_nodes = set(target_nodes)
-    candidates = list(Y.items())
-    with tqdm(total=len(target_nodes), desc="Selecting drivers") as pbar:
-        while not target_nodes <= covered:
-            candidates.sort(key=lambda x: len(x[1] - covered), reverse=True)
-            node, influence = candidates.pop(0)
-            newly_covered = influence - covered
-            covered.update(newly_covered)
-            driver.append(node)
-            pbar.update(len(newly_covered))
-    return driver
+    drivers = {}
+    tasks = ((disease, index.slice(targets), trace_path()) for disease, targets in valid.items())
+    with WorkScheduler(n_jobs) as scheduler:
+        for disease, disease_drivers in scheduler.map(_disease_drivers, tasks):
+            drivers[disease] = disease_drivers
+    return {disease: (drivers[disease], targets) for disease, targets in valid.items()}
 
 if __name__ == "__main__":
     input_folder = "./data_3"
@@ -127,24 +70,18 @@ if __name__ == "__main__":
         base_filename = os.path.splitext(os.path.basename(full_input_path))[0]
 
         print(f"\n📥 Đang xử lý file: {base_filename}...")
-        G = import_network(full_input_path)
+        with stage("phase1.load_network", file=base_filename):
+            G = import_network(full_input_path)
+            # ✅ Khoảng cách tới target lưu trên đĩa theo mạng: các vòng / nhóm bệnh / lần chạy sau dùng lại
+            dist_index = DistanceIndex.open(full_input_path)
 
-        # ✅ Xử lý từng nhóm bệnh
-        for disease, target_nodes in disease_groups.items():
-            # ✅ Kiểm tra target nodes có trong mạng không
-            valid_targets = [node for node in target_nodes if node in G.nodes()]
-            if not valid_targets:
-                print(f"⚠️ Không có target node nào trong mạng cho bệnh: {disease}")
-                continue
+        # ✅ Mọi nhóm bệnh trong 1 lần: khoảng cách dùng chung, chọn driver song song
+        with stage("phase1.diseases", file=base_filename, n_diseases=len(disease_groups)):
+            results = find_drivers_for_diseases(G, disease_groups, dist_index)
 
+        # ✅ Lưu kết quả cho từng bệnh
+        for disease, (drivers, valid_targets) in results.items():
             print(f"🎯 Disease: {disease} - Target nodes: {valid_targets}")
-
-            # ✅ Chạy thuật toán tìm driver nodes
-            H, K = build_H_K_fast(G, valid_targets)
-            Y = compute_Y_fast(H, K)
-            drivers = find_driver_nodes_fast(Y, valid_targets)
-
-            # ✅ Lưu kết quả cho từng bệnh
             result_df = pd.DataFrame([{
                 "Disease": disease,
                 "Driver_Nodes": drivers,
@@ -153,4 +90,3 @@ if __name__ == "__main__":
             out_path = f"{output_folder}/{base_filename}_drivers_{disease}.csv"
             result_df.to_csv(out_path, index=False)
             print(f"💾 Đã lưu kết quả cho bệnh {disease} vào {out_path}")
-
@@ -0,0 +1,145 @@
+# ✅ Network_Loader.py — Hàm đọc mạng dùng chung (thay cho các bản import_network chép ở nhiều file)
+# ✅ Đọc file .txt (Source, Target, Direction, Weight) bằng pandas thành mảng cạnh đánh chỉ số nguyên
+# ✅ + bảng tên node, lưu cache nhị phân cạnh file gốc (theo hash nội dung) để lần sau chỉ cần memory-map.
+
+import glob
+import hashlib
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import networkx as nx
+import scipy.sparse as sp
+from Simulate.Sparse_Engine import NetworkOperator
+
+CACHE_SUFFIX = ".ocdm"
+_CACHE_ARRAYS = ("names", "src", "dst", "weight")
+
+# ✅ Mạng đã biên dịch: cạnh đã tách chiều (Direction = 0 → 2 cạnh), bỏ trùng như networkx
+class CompiledNetwork:
+    """
+    names[i] là tên node i (theo thứ tự xuất hiện, trùng với G.nodes() của import_network cũ);
+    src/dst/weight là các cạnh có hướng theo thứ tự thêm lần đầu, trọng số là giá trị gán sau cùng.
+    """
+    def __init__(self, names, src, dst, weight):
+        self.names = names
+        self.src = src
+        self.dst = dst
+        self.weight = weight
+        self._graph = None
+
+    @property
+    def n_nodes(self):
+        return len(self.names)
+
+    @property
+    def n_edges(self):
+        return len(self.src)
+
+    def node_order(self):
+        return self.names.tolist()
+
+    # ✅ Đồ thị networkx chỉ dựng khi thật sự cần (vẽ mạng, BFS của networkx...)
+    def to_networkx(self):
+        if self._graph is None:
+            names = self.node_order()
+            G = nx.DiGraph()
+            G.add_nodes_from(names)
+            G.add_weighted_edges_from(
+                (names[u], names[v], w) for u, v, w in zip(self.src.tolist(), self.dst.tolist(), self.weight.tolist())
+            )
+            self._graph = G
+        return self._graph
+
+    # ✅ Toán tử CSR cho Phase 2, dựng thẳng từ mảng cạnh (không qua networkx)
+    def operator(self, dtype=np.float64):
+        n = self.n_nodes
+        M = sp.csr_matrix((np.asarray(self.weight, dtype=dtype), (self.dst, self.src)), shape=(n, n))
+        in_weight = np.asarray(M.sum(axis=1)).ravel()
+        return NetworkOperator(self.node_order(), M, in_weight)
+
+def file_hash(file_path):
+    h = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+def _cache_dir(file_path, digest):
+    folder, base = os.path.split(os.path.abspath(file_path))
+    return os.path.join(folder, f".{base}.{digest}{CACHE_SUFFIX}")
+
+# ✅ Đọc file .txt bằng pandas và biên dịch thành mảng (không cache)
+def parse_network(file_path):
+    df = pd.read_csv(file_path, sep="\t", header=0, names=["Source", "Target", "Direction", "Weight"],
+                     dtype={"Source": str, "Target": str}, keep_default_na=False, na_filter=False,
+                     float_precision="round_trip")
+    direction = df["Direction"].to_numpy(dtype=np.int64)
+    weight = df["Weight"].to_numpy(dtype=np.float64)
+
+    # Thứ tự node = thứ tự xuất hiện khi gọi add_edge(from, to) lần lượt từng dòng
+    ends = np.empty(2 * len(df), dtype=object)
+    ends[0::2] = df["Source"].to_numpy()
+    ends[1::2] = df["Target"].to_numpy()
+    codes, names = pd.factorize(ends)
+    u, v = codes[0::2], codes[1::2]
+
+    # Chuỗi cạnh theo đúng thứ tự add_edge: (u→v) rồi (v→u) nếu Direction == 0
+    both = direction == 0
+    per_line = 1 + both
+    pos = np.cumsum(per_line) - per_line
+    m = int(per_line.sum())
+    e_src = np.empty(m, dtype=np.int64)
+    e_dst = np.empty(m, dtype=np.int64)
+    e_w = np.empty(m, dtype=np.float64)
+    e_src[pos], e_dst[pos], e_w[pos] = u, v, weight
+    rev = pos[both] + 1
+    e_src[rev], e_dst[rev], e_w[rev] = v[both], u[both], weight[both]
+
+    # Bỏ cạnh trùng: giữ vị trí thêm lần đầu, trọng số lần gán cuối (như G.add_edge)
+    key = e_src * len(names) + e_dst
+    _, first = np.unique(key, return_index=True)
+    _, last_rev = np.unique(key[::-1], return_index=True)
+    last = m - 1 - last_rev
+    order = np.argsort(first, kind="stable")
+    first, last = first[order], last[order]
+
+    return CompiledNetwork(
+        np.asarray(names, dtype=str),
+        e_src[first].astype(np.int32),
+        e_dst[first].astype(np.int32),
+        e_w[last],
+    )
+
+# ✅ Hàm đọc chính: dùng cache nhị phân nếu còn khớp hash nội dung file gốc
+def load_network(file_path, use_cache=True):
+    if not use_cache:
+        return parse_network(file_path)
+
+    digest = file_hash(file_path)
+    cache = _cache_dir(file_path, digest)
+    if os.path.isdir(cache):
+        try:
+            arrays = [np.load(os.path.join(cache, name + ".npy"), mmap_mode="r") for name in _CACHE_ARRAYS]
+            return CompiledNetwork(*arrays)
+        except (OSError, ValueError):
+            shutil.rmtree(cache, ignore_errors=True)
+
+    net = parse_network(file_path)
+    try:
+        # Xoá cache cũ của cùng file (nội dung đã đổi) rồi ghi cache mới
+        folder, base = os.path.split(os.path.abspath(file_path))
+        for old in glob.glob(os.path.join(folder, glob.escape(f".{base}.") + "*" + CACHE_SUFFIX)):
+            shutil.rmtree(old, ignore_errors=True)
+        tmp = cache + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in _CACHE_ARRAYS:
+            np.save(os.path.join(tmp, name + ".npy"), getattr(net, name))
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # thư mục chỉ đọc: vẫn trả về kết quả, chỉ không cache
+    return net
+
+# ✅ Giữ nguyên giao diện cũ: trả về networkx.DiGraph
+def import_network(file_path):
+    return load_network(file_path).to_networkx()
@@ -0,0 +1,268 @@
+# ✅ Pair_Set.py — Định dạng nhị phân gọn cho file cặp (Driver_Nodes, Target_Nodes) + đọc từng dòng (streaming)
+# ✅ File .pairset = 1 file duy nhất: header JSON + các mảng chỉ số node (int32) đọc bằng memory-map.
+# ✅ Driver của 1 dòng có thể lưu dạng "phần bù của target" trong danh sách node của mạng (Phase1 cũ chọn
+# ✅ mọi node không phải target làm driver) → không phải ghi |V| tên node cho mỗi vòng.
+# ✅ Nhập / xuất không mất thông tin với 2 kiểu CSV đang có: list repr "['A', 'B']" và chuỗi "A,B".
+#
+# ✅ CLI:
+#   python Simulate/Pair_Set.py import pairs.csv --graph network.txt -o pairs.pairset
+#   python Simulate/Pair_Set.py export pairs.pairset -o pairs.csv
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import json
+import struct
+from ast import literal_eval
+import numpy as np
+import pandas as pd
+
+PAIRSET_SUFFIX = ".pairset"
+MAGIC = b"OCDMPAIRS1\n"
+COLUMNS = ["Driver_Nodes", "Target_Nodes"]
+STYLE_LIST, STYLE_COMMA = 0, 1  # kiểu ô CSV: list repr / chuỗi phân cách bằng dấu phẩy
+_ALIGN = 64
+
+# ✅ Ô CSV → danh sách node (list repr hoặc chuỗi "A,B,C"; ô rỗng = không có node)
+def parse_node_list(value):
+    value = str(value).strip()
+    if value.startswith("["):
+        return [str(node) for node in literal_eval(value)]
+    return value.split(',') if value else []
+
+def node_list_style(value):
+    return STYLE_LIST if str(value).strip().startswith("[") else STYLE_COMMA
+
+# ✅ Danh sách node → ô CSV đúng kiểu ban đầu (str(list) như pandas ghi list, hoặc ",".join)
+def format_node_list(nodes, style):
+    return str(list(nodes)) if style == STYLE_LIST else ",".join(nodes)
+
+# ✅ Đọc CSV cặp theo từng khối dòng: yield (row_idx, drivers, targets, (driver_style, target_style))
+def iter_pair_csv_styled(path, chunksize=256):
+    i = 0
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize):
+        for drivers, targets in zip(chunk["Driver_Nodes"], chunk["Target_Nodes"]):
+            yield i, parse_node_list(drivers), parse_node_list(targets), \
+                (node_list_style(drivers), node_list_style(targets))
+            i += 1
+
+# ✅ Ghi file .pairset từ các dòng (drivers, targets); universe = thứ tự node của mạng (cho kiểu phần bù)
+def write_pair_set(path, rows, universe=None, styles=None):
+    rows = [(list(drivers), list(targets)) for drivers, targets in rows]
+    complement = [False] * len(rows)
+    if universe is not None:
+        universe = list(universe)
+        for r, (drivers, targets) in enumerate(rows):
+            target_set = set(targets)
+            complement[r] = [node for node in universe if node not in target_set] == drivers
+    # Bảng tên chỉ chứa cả mạng khi có dòng dùng kiểu phần bù; không thì chỉ các node xuất hiện
+    universe = universe if any(complement) else []
+    names = list(universe)
+    index = {name: i for i, name in enumerate(names)}
+
+    def ids(nodes):
+        out = []
+        for node in nodes:
+            if node not in index:
+                index[node] = len(names)
+                names.append(node)
+            out.append(index[node])
+        return out
+
+    target_ids, target_offsets = [], [0]
+    driver_ids, driver_offsets = [], [0]
+    row_styles = []
+    for r, (drivers, targets) in enumerate(rows):
+        target_ids.extend(ids(targets))
+        target_offsets.append(len(target_ids))
+        if not complement[r]:
+            driver_ids.extend(ids(drivers))
+        driver_offsets.append(len(driver_ids))
+        row_styles.append(styles[r] if styles is not None else (STYLE_LIST, STYLE_LIST))
+
+    encoded = [name.encode("utf-8") for name in names]
+    arrays = {
+        "name_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "name_offsets": np.concatenate(([0], np.cumsum([len(b) for b in encoded]))).astype(np.int32),
+        "target_ids": np.asarray(target_ids, dtype=np.int32),
+        "target_offsets": np.asarray(target_offsets, dtype=np.int64),
+        "driver_ids": np.asarray(driver_ids, dtype=np.int32),
+        "driver_offsets": np.asarray(driver_offsets, dtype=np.int64),
+        "driver_complement": np.asarray(complement, dtype=np.uint8),
+        "styles": np.asarray(row_styles, dtype=np.uint8).reshape(-1, 2),
+    }
+    # Offset của từng mảng tính từ đầu vùng dữ liệu (ngay sau header, căn theo _ALIGN byte)
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = [offset, arr.dtype.str, list(arr.shape)]
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    header = {"version": 1, "columns": COLUMNS, "n_rows": len(complement), "n_universe": len(universe),
+              "arrays": layout}
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // _ALIGN) * _ALIGN
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name][0])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+def is_pair_set(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+# ✅ Đọc file .pairset: mảng mở bằng memory-map, mỗi dòng chỉ giải mã khi được duyệt tới
+class PairSet:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} không phải file {PAIRSET_SUFFIX}")
+            (n,) = struct.unpack("<Q", f.read(8))
+            header_bytes = f.read(n)
+        self.header = json.loads(header_bytes)
+        data_start = -(-(len(MAGIC) + 8 + n) // _ALIGN) * _ALIGN
+        self.arrays = {}
+        for name, (offset, dtype, shape) in self.header["arrays"].items():
+            if int(np.prod(shape)) == 0:
+                self.arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self.arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + offset,
+                                              shape=tuple(shape))
+        blob = bytes(self.arrays["name_blob"])
+        offsets = self.arrays["name_offsets"].tolist()
+        self.names = [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+        self.n_universe = self.header["n_universe"]
+
+    def __len__(self):
+        return self.header["n_rows"]
+
+    def styles(self, i):
+        return tuple(int(s) for s in self.arrays["styles"][i])
+
+    # ✅ 1 dòng: (drivers, targets) dạng danh sách tên node
+    def row(self, i):
+        a = self.arrays
+        t_ids = a["target_ids"][a["target_offsets"][i]:a["target_offsets"][i + 1]]
+        if a["driver_complement"][i]:
+            mask = np.ones(self.n_universe, dtype=bool)
+            mask[t_ids[t_ids < self.n_universe]] = False
+            d_ids = np.flatnonzero(mask)
+        else:
+            d_ids = a["driver_ids"][a["driver_offsets"][i]:a["driver_offsets"][i + 1]]
+        names = self.names
+        return [names[j] for j in d_ids.tolist()], [names[j] for j in t_ids.tolist()]
+
+    # ✅ Số driver của dòng i, tính trên mảng chỉ số (không giải mã tên, không bung dòng phần bù)
+    def n_drivers(self, i):
+        a = self.arrays
+        if a["driver_complement"][i]:
+            t_ids = a["target_ids"][a["target_offsets"][i]:a["target_offsets"][i + 1]]
+            return self.n_universe - len(np.unique(t_ids[t_ids < self.n_universe]))
+        return int(a["driver_offsets"][i + 1] - a["driver_offsets"][i])
+
+    def targets(self, i):
+        a = self.arrays
+        t_ids = a["target_ids"][a["target_offsets"][i]:a["target_offsets"][i + 1]]
+        return [self.names[j] for j in t_ids.tolist()]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            drivers, targets = self.row(i)
+            yield i, drivers, targets
+
+# ✅ Driver của 1 dòng .pairset ở dạng mã hoá (đường dẫn + chỉ số dòng): pickle gọn, chỉ bung thành danh sách
+# ✅ tên node khi worker cần (resolve_drivers); len() không cần bung
+class PairRowDrivers:
+    def __init__(self, path, row, count):
+        self.path = path
+        self.row = row
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def expand(self):
+        return open_pair_set(self.path).row(self.row)[0]
+
+# ✅ Cache theo tiến trình: mỗi worker chỉ mở 1 lần mỗi file .pairset (file bị ghi lại thì mở lại)
+_OPENED = {}
+
+def open_pair_set(path):
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key not in _OPENED:
+        for old in [k for k in _OPENED if k[0] == key[0]]:
+            del _OPENED[old]
+        _OPENED[key] = PairSet(path)
+    return _OPENED[key]
+
+# ✅ Danh sách tên driver (bung PairRowDrivers, danh sách thường giữ nguyên)
+def resolve_drivers(drivers):
+    return drivers.expand() if isinstance(drivers, PairRowDrivers) else drivers
+
+# ✅ Duyệt file cặp bất kỳ (.pairset hoặc CSV 2 kiểu): yield (row_idx, drivers, targets) từng dòng
+# ✅ lazy_drivers=True: driver của dòng .pairset giữ dạng PairRowDrivers (không bung dòng phần bù)
+def iter_pairs(path, lazy_drivers=False):
+    if is_pair_set(path):
+        pairs = PairSet(path)
+        if not lazy_drivers:
+            yield from pairs
+            return
+        for i in range(len(pairs)):
+            yield i, PairRowDrivers(path, i, pairs.n_drivers(i)), pairs.targets(i)
+    else:
+        for i, drivers, targets, _ in iter_pair_csv_styled(path):
+            yield i, drivers, targets
+
+# ✅ CSV → .pairset (graph_path: dùng thứ tự node của mạng để lưu driver dạng phần bù khi khớp)
+def import_pair_csv(csv_path, output_path=None, graph_path=None):
+    universe = None
+    if graph_path is not None:
+        from Simulate.Network_Loader import load_network
+        universe = load_network(graph_path).node_order()
+    rows, styles = [], []
+    for _, drivers, targets, style in iter_pair_csv_styled(csv_path):
+        rows.append((drivers, targets))
+        styles.append(style)
+    output_path = output_path or os.path.splitext(csv_path)[0] + PAIRSET_SUFFIX
+    return write_pair_set(output_path, rows, universe, styles)
+
+# ✅ .pairset → CSV đúng kiểu ô ban đầu của từng dòng
+def export_pair_csv(pairset_path, csv_path=None):
+    pairs = PairSet(pairset_path)
+    records = []
+    for i, drivers, targets in pairs:
+        d_style, t_style = pairs.styles(i)
+        records.append({"Driver_Nodes": format_node_list(drivers, d_style),
+                        "Target_Nodes": format_node_list(targets, t_style)})
+    csv_path = csv_path or os.path.splitext(pairset_path)[0] + ".csv"
+    pd.DataFrame(records, columns=COLUMNS).to_csv(csv_path, index=False)
+    return csv_path
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chuyển file cặp driver-target giữa CSV và .pairset")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="CSV → .pairset")
+    imp.add_argument("csv_path")
+    imp.add_argument("--graph", default=None, help="file mạng: lưu driver = phần bù target khi khớp")
+    imp.add_argument("-o", "--output", default=None)
+    exp = sub.add_parser("export", help=".pairset → CSV")
+    exp.add_argument("pairset_path")
+    exp.add_argument("-o", "--output", default=None)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.command == "import":
+        path = import_pair_csv(args.csv_path, args.output, args.graph)
+    else:
+        path = export_pair_csv(args.pairset_path, args.output)
+    print(f"✅ Đã ghi {path}")
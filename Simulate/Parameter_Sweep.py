@@ -0,0 +1,107 @@
+# ✅ Parameter_Sweep.py — Chạy Phase 2 trên lưới tham số EPSILON / DELTA / MAX_ITER / TOL / N_BETA
+# ✅ Mạng đọc 1 lần, toán tử CSR dựng 1 lần và dùng chung cho mọi điểm lưới;
+# ✅ mọi (điểm lưới × khối alpha) chạy trên cùng 1 pool worker (Scheduler.py), kết quả là 1 bảng dạng dài.
+#
+# ✅ CLI:
+#   python Simulate/Parameter_Sweep.py network.txt pairs.csv --epsilon 0.05 0.1 --delta 0.2 0.3 \
+#       --max-iter 10 --tol 1e-3 --n-beta 2 --engine sparse -o sweep.csv
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import itertools
+import pandas as pd
+from Simulate.Network_Loader import load_network
+from Simulate.Checkpoint import compact_results
+from Simulate.Sparse_Engine import resolve_operator
+from Simulate.Phase2_Multi_Beta_Simulate_Pair import read_pairs, prepare_graph, simulate_block, max_block_width
+from Simulate.Scheduler import WorkScheduler, plan_blocks, alpha_round_costs, resolve_n_jobs
+from Simulate.Profiler import stage, attach_trace, trace_path
+
+SWEEP_PARAMS = ["EPSILON", "DELTA", "MAX_ITER", "TOL", "N_BETA"]
+
+# ✅ Lưới tham số: {"EPSILON": [...], "DELTA": [...], ...} → danh sách dict theo thứ tự tích Descartes
+def expand_grid(grid):
+    missing = [name for name in SWEEP_PARAMS if name not in grid]
+    if missing:
+        raise ValueError(f"Thiếu tham số trong lưới: {', '.join(missing)}")
+    values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in SWEEP_PARAMS]
+    return [dict(zip(SWEEP_PARAMS, combo)) for combo in itertools.product(*values)]
+
+# ✅ Task của sweep: gắn thêm chỉ số điểm lưới vào kết quả của simulate_block
+def _sweep_block(point_idx, params, row_idx, alphas, graph, drivers, engine, batch_size, trace=None):
+    attach_trace(trace)
+    with stage("sweep.point", point=point_idx, **params):
+        return point_idx, simulate_block(row_idx, alphas, graph, drivers, params["EPSILON"], params["DELTA"],
+                                         params["MAX_ITER"], params["TOL"], params["N_BETA"], engine, batch_size,
+                                         trace)
+
+# ✅ Hàm chính: trả về DataFrame với cột EPSILON, DELTA, MAX_ITER, TOL, N_BETA, Alpha_Node, Total_Support
+# ✅ (mỗi điểm lưới × alpha 1 dòng; trong mỗi điểm lưới, alpha theo đúng thứ tự file cặp như Phase 2)
+def sweep_from_driver_target_file(graph_path, pair_csv_path, grid, engine="sparse", precision="float64",
+                                  memory_budget_mb=None, n_jobs=None):
+    points = expand_grid(grid)
+    net = load_network(graph_path)
+    rows = read_pairs(pair_csv_path)
+    n_jobs = resolve_n_jobs(n_jobs)
+    graph, _, batch_size = prepare_graph(net, engine, rows, n_jobs, precision, memory_budget_mb)
+
+    done = [{} for _ in points]
+    try:
+        # ✅ Khối theo chi phí cho từng điểm lưới, gộp lại và xếp khối nặng trước;
+        # ✅ chi phí 1 lượt của mỗi alpha chỉ phụ thuộc mạng nên tính 1 lần cho mọi điểm lưới
+        op = None if engine == "dense" else resolve_operator(graph)
+        width = max_block_width(rows, engine, n_jobs)
+        round_costs = [alpha_round_costs(op, drivers, alphas, engine) for _, drivers, alphas in rows]
+        tasks = []
+        for point_idx, params in enumerate(points):
+            for cost, row_idx, alphas, drivers in plan_blocks(rows, op, engine, params["N_BETA"], n_jobs, width,
+                                                               round_costs, with_cost=True):
+                tasks.append((cost, (point_idx, params, row_idx, alphas, graph, drivers, engine, batch_size,
+                                     trace_path())))
+        tasks.sort(key=lambda task: -task[0])
+
+        with WorkScheduler(n_jobs) as scheduler:
+            for point_idx, (row_idx, pairs) in scheduler.map(_sweep_block, (args for _, args in tasks)):
+                for alpha, support in pairs:
+                    done[point_idx][(row_idx, alpha)] = support
+    finally:
+        if engine != "dense":
+            graph.release()
+
+    row_targets = [(row_idx, targets) for row_idx, _, targets in rows]
+    frames = []
+    for params, point_done in zip(points, done):
+        df = compact_results(point_done, row_targets)
+        for name in reversed(SWEEP_PARAMS):
+            df.insert(0, name, params[name])
+        frames.append(df)
+    columns = SWEEP_PARAMS + ["Alpha_Node", "Total_Support"]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy Phase 2 trên lưới tham số")
+    parser.add_argument("graph_path", help="file mạng .txt (Source, Target, Direction, Weight)")
+    parser.add_argument("pair_csv_path", help="file cặp Driver_Nodes, Target_Nodes")
+    parser.add_argument("--epsilon", type=float, nargs="+", default=[0.1])
+    parser.add_argument("--delta", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--max-iter", type=int, nargs="+", default=[10])
+    parser.add_argument("--tol", type=float, nargs="+", default=[1e-3])
+    parser.add_argument("--n-beta", type=int, nargs="+", default=[2])
+    parser.add_argument("--engine", default="sparse", choices=["sparse", "frontier", "batched", "steady", "dense"])
+    parser.add_argument("--precision", default="float64", choices=["float64", "float32", "auto"])
+    parser.add_argument("--memory-budget-mb", type=float, default=None)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("-o", "--output", default=None, help="file CSV kết quả (mặc định: <pair>_sweep.csv)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = _parse_args()
+    grid = {"EPSILON": args.epsilon, "DELTA": args.delta, "MAX_ITER": args.max_iter,
+            "TOL": args.tol, "N_BETA": args.n_beta}
+    df = sweep_from_driver_target_file(args.graph_path, args.pair_csv_path, grid, args.engine, args.precision,
+                                       args.memory_budget_mb, args.n_jobs)
+    output = args.output or os.path.splitext(args.pair_csv_path)[0] + "_sweep.csv"
+    df.to_csv(output, index=False)
+    print(f"✅ Đã lưu {len(df)} dòng kết quả vào {output}")
@@ -0,0 +1,241 @@
+# ✅ Phase1_Core.py — Lõi Phase 1 dùng chung cho Find_target_and_driver_nodes.py (chọn target theo vòng)
+# ✅ và Find_target_and_driver_nodes_ver2.py (target theo nhóm bệnh): chọn target, dựng H / K,
+# ✅ tính Y và chọn driver theo greedy.
+
+import networkx as nx
+import numpy as np
+import heapq
+from tqdm import tqdm
+import random
+from joblib import Parallel, delayed, cpu_count
+from Simulate.Sparse_Engine import build_network_operator
+from Simulate.Shared_Graph import publish_operator, process_sources_shared, reverse_distances
+from Simulate.Reachability import ReachabilityIndex
+from Simulate.Distance_Store import TargetDistances, UNREACHABLE, distance_dtype
+from Simulate.Profiler import stage
+
+def select_target_nodes_non_overlap(G: nx.DiGraph, percent, excluded_nodes, index=None):
+    nodes = list(set(G.nodes()) - excluded_nodes)
+    d = int(percent * len(G.nodes()) / 100)
+
+    # ✅ Nếu số node còn lại < d thì chọn hết phần còn lại
+    if len(nodes) <= d:
+        return nodes
+
+    # ✅ Ngược lại chọn bình thường nhưng đảm bảo liên thông
+    # ✅ Số node tới được lấy từ chỉ mục SCC (dựng 1 lần cho mỗi đồ thị, truyền lại qua index=...);
+    # ✅ chỉ lần thử thành công mới duyệt nx.descendants để lấy đúng tập / thứ tự như trước
+    if index is None:
+        index = ReachabilityIndex(G)
+    index.set_excluded(excluded_nodes)
+    max_trials = 1000  # Tránh lặp vô hạn
+    for _ in range(max_trials):
+        start = random.choice(nodes)
+        if not index.reaches_at_least(start, d):
+            continue
+        reachable = set(nx.descendants(G, start)) | {start}
+        reachable = reachable - excluded_nodes
+        selected = list(reachable)[:d]
+        return selected
+
+    # ✅ Nếu không tìm được thành phần liên thông đủ lớn thì dừng
+    print("⚠️ Không còn thành phần liên thông đủ lớn, dừng việc chọn target node!")
+    return []
+
+# ✅ engine="reverse" (mặc định): 1 BFS ngược từ mỗi target, O(|T|·(V+E)) thay vì BFS từ mọi node;
+# ✅ engine="forward": BFS từ mọi node nguồn trên worker joblib (bản trước). Hai engine cho H, K giống hệt nhau.
+# ✅ H, K là view trên ma trận khoảng cách target × nguồn (Distance_Store.py), không dựng |T|×|V| list Python.
+# ✅ index: DistanceIndex của mạng (Distance_Store.py) → chỉ cắt hàng có sẵn, BFS cho target chưa gặp
+def build_H_K_fast(G: nx.DiGraph, target_nodes, max_depth=None, engine="reverse", index=None):
+    if index is not None:
+        with stage("phase1.bfs", n_sources=len(index.nodes), n_targets=len(target_nodes)):
+            store = index.slice(target_nodes, max_depth)
+        return store.H, store.K
+    if engine == "forward":
+        return _build_H_K_forward(G, target_nodes, max_depth)
+    nodes = list(G.nodes())
+    with stage("phase1.compile_graph"):
+        op = build_network_operator(G, nodes)
+    target_idx = np.array([op.node_index[t] for t in target_nodes], dtype=np.int64)
+    with stage("phase1.bfs", n_sources=len(nodes), n_targets=len(target_nodes)):
+        D = reverse_distances(op, target_idx, max_depth, dtype=distance_dtype(len(nodes)))
+    store = TargetDistances(nodes, target_nodes, D)
+    return store.H, store.K
+
+def _build_H_K_forward(G: nx.DiGraph, target_nodes, max_depth=None):
+    nodes = list(G.nodes())
+    n_cores = max(1, cpu_count() // 2)
+    # ✅ Đồ thị ghi 1 lần vào bộ nhớ chia sẻ; mỗi task chỉ nhận handle + khối chỉ số node nguồn
+    with stage("phase1.compile_graph"):
+        op = build_network_operator(G, nodes)
+        handle = publish_operator(op)
+    target_idx = np.array([op.node_index[t] for t in target_nodes], dtype=np.int64)
+    chunks = np.array_split(np.arange(len(nodes)), n_cores * 8)
+    try:
+        with stage("phase1.bfs", n_sources=len(nodes), n_targets=len(target_nodes)):
+            results = Parallel(n_jobs=n_cores)(
+                delayed(process_sources_shared)(handle, chunk, target_idx, max_depth)
+                for chunk in tqdm(chunks, desc="Parallel BFS")
+            )
+    finally:
+        handle.release()
+    with stage("phase1.assemble_HK"):
+        store = TargetDistances(nodes, target_nodes,
+                                np.full((len(target_nodes), len(nodes)), UNREACHABLE, dtype=distance_dtype(len(nodes))))
+        for chunk_results in results:
+            for _, _, K_updates in chunk_results:
+                for tgt, s, d in K_updates:
+                    store.D[store.target_rows[tgt], op.node_index[s]] = d
+    return store.H, store.K
+
+# ✅ Y[src]: mỗi chữ ký khoảng cách (frozenset(K[t][src])) giữ 1 target đại diện — target gặp đầu tiên khi duyệt
+# ✅ tập reached như bản so sánh từng cặp trước đây, nhưng gom nhóm bằng dict theo chữ ký trong 1 lượt duyệt.
+# ✅ H, K là view của TargetDistances (build_H_K_fast) → tính thẳng trên mảng khoảng cách (_compute_Y_store).
+def compute_Y_fast(H, K):
+    store = getattr(K, "store", None)
+    if store is not None and getattr(H, "store", None) is store:
+        return _compute_Y_store(store)
+    Y = {}
+    for src in tqdm(H.keys(), desc="Computing Y sets"):
+        H_src = H[src]
+        reached = set()
+        for d in H_src:
+            reached.update(H_src[d])
+        # Mỗi target có đúng 1 khoảng cách BFS từ src → chữ ký frozenset(K[t][src]) = {d} với d lấy từ H[src]
+        signature = {t: d for d, ts in H_src.items() for t in ts}
+        first = {}
+        for t in reached:
+            first.setdefault(signature[t], t)
+        Y[src] = set(first.values())
+    return Y
+
+# ✅ Y trên mảng D (target × nguồn): lọc / gom nhóm (nguồn, khoảng cách) và chọn đại diện đều bằng numpy trên
+# ✅ cả ma trận. Mỗi nguồn chỉ còn dựng tập reached y như bản dict (từng nhóm khoảng cách theo thứ tự H[src],
+# ✅ mỗi nhóm là set theo thứ tự target) để lấy đúng thứ tự duyệt của nó — đại diện vẫn là target gặp đầu tiên.
+def _compute_Y_store(store):
+    DT = np.ascontiguousarray(store.D.T)  # hàng = nguồn
+    names = np.array(store.targets, dtype=object)
+    row_of = {}
+    for i, t in enumerate(store.targets):
+        row_of.setdefault(t, i)
+    span = int(DT.max(initial=0)) + 2
+
+    # Các ô tới được, theo (nguồn, vị trí target); nhóm (nguồn, d) giữ thứ tự target trong nhóm và được duyệt
+    # theo lần xuất hiện đầu của d như H[src]
+    src, row = np.nonzero(DT != UNREACHABLE)
+    keys = src * span + DT[src, row]
+    order = np.argsort(keys, kind="stable")
+    starts = np.flatnonzero(np.diff(keys[order], prepend=-1))
+    ends = np.append(starts[1:], len(order))
+    groups = np.argsort(order[starts])
+    starts, ends = starts[groups].tolist(), ends[groups].tolist()
+    group_names = names[row[order]].tolist()
+    src_bounds = np.searchsorted(src[order[starts]], np.arange(len(store.nodes) + 1))
+
+    # Thứ tự duyệt tập reached của từng nguồn → vị trí target
+    iter_rows = []
+    for j in tqdm(np.flatnonzero(np.diff(src_bounds)).tolist(), desc="Computing Y sets"):
+        reached = set()
+        for g in range(src_bounds[j], src_bounds[j + 1]):
+            reached.update(set(group_names[starts[g]:ends[g]]))
+        iter_rows.append(np.fromiter(map(row_of.__getitem__, reached), dtype=np.int64, count=len(reached)))
+
+    # Đại diện: ô đầu tiên của mỗi (nguồn, d) theo thứ tự duyệt
+    Y = {node: set() for node in store.nodes}
+    if iter_rows:
+        lengths = [len(r) for r in iter_rows]
+        iter_src = np.repeat(np.flatnonzero(np.diff(src_bounds)), lengths)
+        iter_row = np.concatenate(iter_rows)
+        _, rep = np.unique(iter_src * span + DT[iter_src, iter_row], return_index=True)
+        rep_src = iter_src[rep]
+        rep_names = names[iter_row[rep]].tolist()
+        bounds = np.flatnonzero(np.diff(rep_src)) + 1
+        for j, start, stop in zip(rep_src[np.concatenate(([0], bounds))].tolist(),
+                                  [0] + bounds.tolist(), bounds.tolist() + [len(rep_src)]):
+            Y[store.nodes[j]] = set(rep_names[start:stop])
+    return Y
+
+# ✅ Ứng viên không bị trội (giữ thứ tự Y): bỏ Y rỗng, Y trùng với ứng viên đứng trước, Y là tập con thực sự
+# ✅ của ứng viên khác. Ứng viên bị trội luôn xếp sau ứng viên trội hơn (gain từng lượt ≤, hoà thì đứng sau)
+# ✅ và hết gain khi ứng viên đó được chọn → greedy không bao giờ chọn nó, kết quả giữ nguyên.
+def undominated_candidates(Y):
+    first = {}
+    for node, ys in Y.items():
+        if ys:
+            first.setdefault(frozenset(ys), node)
+    sets = list(first)
+    holders = {}
+    for i, s in enumerate(sets):
+        for t in s:
+            holders.setdefault(t, []).append(i)
+    dominated = set()
+    for i, s in enumerate(sets):
+        rarest = min(s, key=lambda t: len(holders[t]))
+        if any(len(sets[j]) > len(s) and s <= sets[j] for j in holders[rarest]):
+            dominated.add(first[s])
+    keep = set(first.values()) - dominated
+    return [node for node in Y if node in keep]
+
+# ✅ engine="heap" (mặc định): greedy trên hàng đợi ưu tiên, gain cập nhật dần qua chỉ mục target → ứng viên
+# ✅ (mục cũ trong heap bỏ qua khi lấy ra), chỉ trên các ứng viên không bị trội;
+# ✅ engine="sort": bản cũ, sắp xếp lại toàn bộ ứng viên mỗi lượt.
+# ✅ Hai engine chọn cùng driver, cùng thứ tự (kể cả khi hoà gain).
+def find_driver_nodes_fast(Y, target_nodes, engine="heap"):
+    if engine == "sort":
+        return _find_driver_nodes_sort(Y, target_nodes)
+    candidates = undominated_candidates(Y)
+    gain = [len(Y[node]) for node in candidates]
+    holders = {}  # target → các ứng viên có target đó trong Y
+    for c, node in enumerate(candidates):
+        for t in Y[node]:
+            holders.setdefault(t, []).append(c)
+
+    # Khoá thứ tự giống danh sách sau mỗi lần sort ổn định của bản cũ: gain giảm dần; cùng gain thì ứng viên
+    # vừa bị giảm gain ở lượt gần hơn đứng trước, giữa chúng giữ thứ tự cũ (khoá lồng), ban đầu theo thứ tự Y
+    key = [(-g, 0, c) for c, g in enumerate(gain)]
+    heap = [(k, c) for c, k in enumerate(key)]
+    heapq.heapify(heap)
+
+    driver = []
+    covered = set()
+    remaining = set(target_nodes)
+    step = 0
+    with tqdm(total=len(remaining), desc="Selecting drivers") as pbar:
+        while remaining:
+            k, c = heapq.heappop(heap)
+            if k is not key[c]:
+                continue  # mục cũ: gain của c đã giảm sau khi đưa vào heap
+            key[c] = None
+            node = candidates[c]
+            newly_covered = Y[node] - covered
+            covered.update(newly_covered)
+            remaining -= newly_covered
+            driver.append(node)
+            pbar.update(len(newly_covered))
+
+            step += 1
+            changed = set()
+            for t in newly_covered:
+                for h in holders[t]:
+                    gain[h] -= 1
+                    changed.add(h)
+            for h in changed:
+                if key[h] is not None:
+                    key[h] = (-gain[h], -step, key[h])
+                    heapq.heappush(heap, (key[h], h))
+    return driver
+
+def _find_driver_nodes_sort(Y, target_nodes):
+    driver = []
+    covered = set()
+    target_nodes = set(target_nodes)
+    candidates = list(Y.items())
+    with tqdm(total=len(target_nodes), desc="Selecting drivers") as pbar:
+        while not target_nodes <= covered:
+            candidates.sort(key=lambda x: len(x[1] - covered), reverse=True)
+            node, influence = candidates.pop(0)
+            newly_covered = influence - covered
+            covered.update(newly_covered)
+            driver.append(node)
+            pbar.update(len(newly_covered))
+    return driver
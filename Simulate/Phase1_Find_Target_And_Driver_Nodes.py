@@ -1,23 +1,12 @@
 # ✅ Find_target_and_driver_nodes.py — Pha 1 của phương pháp 3 (đã sửa lại logic đúng)
 # ✅ Tìm nhiều cặp (Driver_Nodes, Target_Nodes) qua nhiều vòng lặp như code gốc
 
-import networkx as nx
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import pandas as pd
 import random
-
-# ✅ Hàm đọc mạng từ file .txt
-def import_network(file_path):
-    with open(file_path, "r") as f:
-        data = f.readlines()[1:]
-    G = nx.DiGraph()
-    for line in data:
-        from_node, to_node, direction, weight = line.strip().split("\t")
-        direction = int(direction)
-        weight = float(weight)
-        G.add_edge(from_node, to_node, weight=weight)
-        if direction == 0:
-            G.add_edge(to_node, from_node, weight=weight)
-    return G
+from Simulate.Network_Loader import import_network  # ✅ Hàm đọc mạng dùng chung (có cache)
 
 # ✅ Hàm chọn tập target mới không giao với các target đã chọn trước đó
 
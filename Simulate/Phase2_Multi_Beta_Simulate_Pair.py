@@ -1,24 +1,16 @@
 # ✅ Phase2_Multi_Beta_Simulate_Pair.py — Bổ sung chạy song song bằng joblib cho phase 2
 
-import networkx as nx
+import os
 import numpy as np
 import pandas as pd
-from joblib import Parallel, delayed  # ✅ Thêm joblib để chạy song song
-from multiprocessing import cpu_count
-
-# ✅ Hàm đọc mạng từ file .txt
-def import_network(file_path):
-    with open(file_path, "r") as f:
-        data = f.readlines()[1:]
-    G = nx.DiGraph()
-    for line in data:
-        from_node, to_node, direction, weight = line.strip().split("\t")
-        direction = int(direction)
-        weight = float(weight)
-        G.add_edge(from_node, to_node, weight=float(weight))
-        if direction == 0:
-            G.add_edge(to_node, from_node, weight=float(weight))
-    return G
+from Simulate.Sparse_Engine import simulate_one_alpha_sparse, simulate_alphas_batched, plan_memory, resolve_operator
+from Simulate.Shared_Graph import publish_operator
+from Simulate.Network_Loader import import_network, load_network, file_hash  # ✅ Hàm đọc mạng dùng chung (có cache)
+from Simulate.Pair_Set import iter_pairs, resolve_drivers  # ✅ CSV 2 kiểu ô hoặc .pairset
+from Simulate.Checkpoint import ResultCheckpoint, checkpoint_path, compact_results, run_key
+from Simulate.Sharding import shard_rows, shard_label, write_manifest
+from Simulate.Profiler import stage, record_convergence, attach_trace, trace_path
+from Simulate.Scheduler import WorkScheduler, plan_blocks, resolve_n_jobs  # ✅ 1 pool cho mọi (dòng, alpha)
 
 # ✅ Tạo ma trận kề và danh sách hàng xóm
 def build_adjacency(G, node_order):
@@ -47,7 +39,8 @@ def update_states(x, A, neighbors, beta_indices, beta_weights, fixed_nodes, EPSI
 def simulate_one_round(G, beta_nodes, alpha_node, x_prev, EPSILON, DELTA, MAX_ITER, TOL):
     node_order = list(G.nodes())
     extended = node_order + [f"Beta{i}" for i in range(len(beta_nodes))]
-    A, neighbors, node_index = build_adjacency(G, extended)
+    with stage("phase2.build_adjacency"):
+        A, neighbors, node_index = build_adjacency(G, extended)
 
     x = np.pad(x_prev, (0, len(extended) - len(x_prev)), mode='constant')
     beta_indices = []
@@ -64,12 +57,15 @@ def simulate_one_round(G, beta_nodes, alpha_node, x_prev, EPSILON, DELTA, MAX_IT
         fixed_nodes.add(bidx)
         beta_weights[node_index[b]][i] = 1.0
 
-    for _ in range(MAX_ITER):
+    it, residual = 0, np.nan
+    for it in range(1, MAX_ITER + 1):
         x_new = update_states(x, A, neighbors, beta_indices, beta_weights, fixed_nodes, EPSILON, DELTA)
-        if np.linalg.norm(x_new - x) < TOL:
+        residual = np.linalg.norm(x_new - x)
+        if residual < TOL:
             break
         x = x_new
 
+    record_convergence("dense", it, residual, TOL, MAX_ITER)
     return x[:len(node_order)]
 
 # ✅ Tổng hỗ trợ
@@ -96,24 +92,149 @@ def simulate_one_alpha(alpha_node, G, drivers, node_order, EPSILON, DELTA, MAX_I
     support = compute_total_support(x_state, alpha_idx)
     return {"Alpha_Node": alpha_node, "Total_Support": support}
 
+# ✅ 1 task song song: một khối alpha của 1 dòng → (row_idx, [(alpha, Total_Support | None), ...])
+# ✅ graph là handle bộ nhớ chia sẻ / NetworkOperator (engine CSR) hoặc networkx.DiGraph (engine "dense")
+def simulate_block(row_idx, alphas, graph, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, engine="sparse",
+                   batch_size=None, trace=None):
+    attach_trace(trace)  # ✅ trace: đường dẫn file profiling của tiến trình chính (None = tắt)
+    drivers = resolve_drivers(drivers)  # ✅ driver .pairset chỉ bung thành tên node tại worker
+    with stage("phase2.block", row=row_idx, engine=engine, n_alphas=len(alphas)):
+        if engine in ("batched", "steady"):
+            results = simulate_alphas_batched(alphas, graph, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA,
+                                              steady_state=(engine == "steady"), batch_size=batch_size)
+            found = {r["Alpha_Node"]: r["Total_Support"] for r in results}
+            return row_idx, [(alpha, found.get(alpha)) for alpha in alphas]
+
+        pairs = []
+        for alpha in alphas:
+            with stage("phase2.alpha", alpha=alpha):
+                if engine == "dense":
+                    r = simulate_one_alpha(alpha, graph, drivers, list(graph.nodes()), EPSILON, DELTA, MAX_ITER, TOL,
+                                           N_BETA)
+                else:
+                    r = simulate_one_alpha_sparse(alpha, graph, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA,
+                                                  frontier=(engine == "frontier"))
+            pairs.append((alpha, None if r is None else r["Total_Support"]))
+        return row_idx, pairs
+
+# ✅ Đọc file cặp (CSV list repr / chuỗi "A,B" hoặc .pairset) → [(row_idx, drivers, targets)]
+# ✅ Driver của file .pairset giữ dạng mã hoá (PairRowDrivers: đường dẫn + chỉ số dòng, len() không cần bung),
+# ✅ kể cả dòng "phần bù" — chỉ worker mới bung thành |V| tên node (simulate_block)
+def read_pairs(pair_csv_path):
+    return list(iter_pairs(pair_csv_path, lazy_drivers=True))
+
+# ✅ Bề rộng tối đa 1 khối alpha của engine batched / steady (None: engine 1 alpha / lần, không giới hạn)
+def max_block_width(rows, engine, n_jobs):
+    if engine not in ("batched", "steady"):
+        return None
+    max_targets = max((len(targets) for _, _, targets in rows), default=1)
+    return max(1, -(-max_targets // n_jobs))
+
+# ✅ Chuẩn bị đồ thị cho các task: toán tử CSR dựng 1 lần (thẳng từ mảng cạnh), dùng chung cho mọi dòng/alpha
+# ✅ Trả về (graph, dtype, batch_size); graph là handle bộ nhớ chia sẻ (engine CSR, gọi graph.release() khi xong)
+# ✅ hoặc networkx.DiGraph (engine "dense")
+def prepare_graph(net, engine, rows, n_jobs, precision="float64", memory_budget_mb=None):
+    if engine == "dense":
+        return net.to_networkx(), np.dtype(np.float64), None
+    op = net.operator()
+    dtype, batch_size = plan_memory(op, max_block_width(rows, engine, n_jobs) or 1, memory_budget_mb, precision)
+    # ✅ Ghi toán tử 1 lần vào bộ nhớ chia sẻ; mỗi task chỉ pickle handle
+    return publish_operator(op.astype(dtype)), dtype, batch_size
+
 # ✅ Gọi từ file driver-target
 
-def simulate_from_driver_target_file(graph_path, pair_csv_path, EPSILON, DELTA, MAX_ITER, TOL, N_BETA):
-    G = import_network(graph_path)
-    node_order = list(G.nodes())
-    pair_df = pd.read_csv(pair_csv_path)
-
-    all_results = []
-    for _, row in pair_df.iterrows():
-        drivers = row['Driver_Nodes'].split(',')
-        targets = row['Target_Nodes'].split(',')
-
-        # ✅ Chạy song song các alpha_node
-        results = Parallel(n_jobs=cpu_count() // 2)(
-            delayed(simulate_one_alpha)(alpha_node, G, drivers, node_order,
-                                        EPSILON, DELTA, MAX_ITER, TOL, N_BETA)
-            for alpha_node in targets
-        )
-        all_results.extend([r for r in results if r is not None])
-
-    return pd.DataFrame(all_results)
+# ✅ engine="sparse" (mặc định, CSR), "batched" (mọi alpha của 1 dòng thành ma trận n×k),
+# ✅ "steady" (như batched nhưng giải trực tiếp điểm dừng mỗi lượt khi vòng lặp chắc chắn hội tụ về đó trong
+# ✅ MAX_ITER bước, không thì lặp như batched), "frontier" (như sparse nhưng
+# ✅ chỉ cập nhật node đã bị lan tới) hoặc "dense" (bản gốc, để đối chiếu)
+# ✅ precision: "float64" | "float32" | "auto"; memory_budget_mb: trần bộ nhớ mỗi worker (MB) để chọn
+# ✅ dtype và bề rộng khối alpha (chỉ áp dụng cho các engine CSR)
+# ✅ checkpoint_dir: nếu có, mỗi (dòng, alpha) xong được ghi nối vào file trong thư mục này;
+# ✅ chạy lại cùng mạng / file cặp / tham số sẽ bỏ qua phần đã xong
+# ✅ n_jobs: số worker (None / 0 = nửa số lõi như trước, -1 = mọi lõi)
+# ✅ shard=(i, N): chỉ chạy các (dòng, alpha) của shard i / N (cần checkpoint_dir dùng chung giữa các máy);
+# ✅ khi xong ghi manifest để functions/merged_csv.py gộp lại
+def simulate_from_driver_target_file(graph_path, pair_csv_path, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, engine="sparse",
+                                     precision="float64", memory_budget_mb=None, checkpoint_dir=None, n_jobs=None,
+                                     shard=None):
+    if shard is not None and not checkpoint_dir:
+        raise ValueError("Chạy theo shard cần checkpoint_dir (thư mục kết quả dùng chung)")
+    with stage("phase2.load_network"):
+        net = load_network(graph_path)
+        rows = read_pairs(pair_csv_path)
+    if shard is not None:
+        rows = shard_rows(rows, *shard)
+    n_jobs = resolve_n_jobs(n_jobs)
+    with stage("phase2.prepare_graph", engine=engine):
+        graph, dtype, batch_size = prepare_graph(net, engine, rows, n_jobs, precision, memory_budget_mb)
+
+    checkpoint = None
+    done = {}
+    if checkpoint_dir:
+        params = {"EPSILON": EPSILON, "DELTA": DELTA, "MAX_ITER": MAX_ITER, "TOL": TOL, "N_BETA": N_BETA,
+                  "engine": engine, "dtype": dtype.name}
+        label = shard_label(*shard) if shard is not None else None
+        checkpoint = ResultCheckpoint(checkpoint_path(checkpoint_dir, graph_path, pair_csv_path, params, label))
+        done = checkpoint.done()
+
+    try:
+        # ✅ Mọi (dòng, alpha) còn lại của cả file → khối theo chi phí, chạy trên 1 pool duy nhất
+        with stage("phase2.schedule", engine=engine):
+            todo = [(row_idx, drivers, [alpha for alpha in targets if (row_idx, alpha) not in done])
+                    for row_idx, drivers, targets in rows]
+            op = None if engine == "dense" else resolve_operator(graph)
+            blocks = plan_blocks([row for row in todo if row[2]], op, engine, N_BETA, n_jobs,
+                                 max_block_width(rows, engine, n_jobs))
+        with stage("phase2.run", n_blocks=len(blocks)), WorkScheduler(n_jobs) as scheduler:
+            results = scheduler.map(simulate_block, (
+                (row_idx, alphas, graph, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, engine, batch_size,
+                 trace_path())
+                for row_idx, alphas, drivers in blocks
+            ))
+            # ✅ Ghi từng kết quả ngay khi task xong
+            for r_idx, pairs in results:
+                for alpha, support in pairs:
+                    if checkpoint is not None:
+                        checkpoint.append(r_idx, alpha, support)
+                    else:
+                        done[(r_idx, alpha)] = support
+    finally:
+        if engine != "dense":
+            graph.release()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if shard is not None:
+        expected = {(row_idx, alpha) for row_idx, _, targets in rows for alpha in targets}
+        write_manifest(checkpoint.path, {
+            "run_key": run_key(graph_path, pair_csv_path, params), "graph_hash": file_hash(graph_path),
+            "pair_hash": file_hash(pair_csv_path), "params": params, "shard_index": shard[0],
+            "n_shards": shard[1], "parts_file": os.path.basename(checkpoint.path), "n_tasks": len(expected),
+            "complete": expected <= set(done),
+        })
+    return compact_results(done, [(row_idx, targets) for row_idx, _, targets in rows])
+
+# ✅ Báo cáo lệch dấu Total_Support so với kết quả tham chiếu float64
+def compare_support_signs(reference_df, result_df):
+    # Hai lần chạy cùng file cặp cho ra các dòng cùng thứ tự nên so sánh theo vị trí
+    if list(reference_df["Alpha_Node"]) != list(result_df["Alpha_Node"]):
+        raise ValueError("Hai kết quả không cùng danh sách Alpha_Node")
+    report = pd.DataFrame({
+        "Alpha_Node": reference_df["Alpha_Node"].values,
+        "Total_Support_ref": reference_df["Total_Support"].values,
+        "Total_Support_test": result_df["Total_Support"].values,
+    })
+    report["Sign_Differs"] = np.sign(report["Total_Support_ref"]) != np.sign(report["Total_Support_test"])
+    return report
+
+# ✅ Chạy cùng cấu hình ở float64 và ở precision cần kiểm tra, trả về bảng so sánh dấu
+def precision_report(graph_path, pair_csv_path, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, engine="sparse",
+                     precision="float32", memory_budget_mb=None):
+    reference = simulate_from_driver_target_file(graph_path, pair_csv_path, EPSILON, DELTA, MAX_ITER, TOL, N_BETA,
+                                                 engine=engine, precision="float64")
+    result = simulate_from_driver_target_file(graph_path, pair_csv_path, EPSILON, DELTA, MAX_ITER, TOL, N_BETA,
+                                              engine=engine, precision=precision, memory_budget_mb=memory_budget_mb)
+    report = compare_support_signs(reference, result)
+    n_diff = int(report["Sign_Differs"].sum())
+    print(f"{'⚠️' if n_diff else '✅'} {n_diff}/{len(report)} alpha node đổi dấu Total_Support so với float64")
+    return report
@@ -0,0 +1,180 @@
+# ✅ Profiler.py — Đo thời gian / bộ nhớ từng giai đoạn và số bước hội tụ (tuỳ chọn, mặc định tắt)
+# ✅ Bật bằng enable_profiling("trace.jsonl") hoặc biến môi trường OCDM_PROFILE=trace.jsonl.
+# ✅ Mỗi bản ghi là 1 dòng JSON (kind = "stage" | "convergence"), mọi tiến trình (kể cả worker joblib)
+# ✅ ghi nối vào cùng file; summarize_trace gom lại thành bảng để tìm điểm nóng và chọn TOL / MAX_ITER.
+#
+# ✅ Tổng hợp:
+#   python Simulate/Profiler.py trace.jsonl [-o prefix]   → in bảng, ghi prefix_stages.csv / prefix_convergence.csv
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+import numpy as np
+import pandas as pd
+
+PROFILE_ENV = "OCDM_PROFILE"
+
+_STATE = {"path": None, "file": None, "stack": [], "started_tracemalloc": False}
+_NULL = nullcontext()
+
+# ✅ Bật / tắt ghi trace cho tiến trình hiện tại
+def enable_profiling(trace_path):
+    if _STATE["path"] == os.path.abspath(trace_path):
+        return
+    disable_profiling()
+    trace_path = os.path.abspath(trace_path)
+    folder = os.path.dirname(trace_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    _STATE["path"] = trace_path
+    _STATE["file"] = open(trace_path, "a")
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STATE["started_tracemalloc"] = True
+
+def disable_profiling():
+    if _STATE["file"] is not None:
+        _STATE["file"].close()
+    if _STATE["started_tracemalloc"]:
+        tracemalloc.stop()
+    _STATE.update(path=None, file=None, stack=[], started_tracemalloc=False)
+
+def profiling_enabled():
+    return _STATE["path"] is not None
+
+def trace_path():
+    return _STATE["path"]
+
+def _write(records):
+    f = _STATE["file"]
+    f.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+    f.flush()
+
+def _context():
+    stack = _STATE["stack"]
+    ctx = {}
+    for frame in stack:
+        ctx.update(frame["fields"])
+    ctx["stage"] = stack[-1]["name"] if stack else None
+    return ctx
+
+# ✅ Đo 1 giai đoạn: wall / CPU time, bộ nhớ đỉnh (tracemalloc, tính trên mức lúc bắt đầu)
+# ✅ fields (row, engine, ...) được ghi kèm và truyền xuống các bản ghi lồng bên trong
+def stage(name, **fields):
+    if _STATE["path"] is None:
+        return _NULL
+    return _stage(name, fields)
+
+@contextmanager
+def _stage(name, fields):
+    stack = _STATE["stack"]
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+    tracemalloc.reset_peak()
+    frame = {"name": name, "fields": fields, "start_mem": current, "peak": current}
+    stack.append(frame)
+    ts = time.time()
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        _, peak = tracemalloc.get_traced_memory()
+        frame["peak"] = max(frame["peak"], peak)
+        stack.pop()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+        record = {"kind": "stage", "name": name, "pid": os.getpid(), "ts": ts, "depth": len(stack),
+                  "parent": stack[-1]["name"] if stack else None, "wall_s": wall, "cpu_s": cpu,
+                  "peak_mb": (frame["peak"] - frame["start_mem"]) / 2 ** 20}
+        for frame_above in stack:
+            record.update(frame_above["fields"])
+        record.update(fields)
+        _write([record])
+
+# ✅ Số bước tới hội tụ và phần dư cuối của 1 lượt (iterations / residual có thể là mảng: mỗi cột 1 alpha)
+def record_convergence(engine, iterations, residual, TOL, MAX_ITER):
+    if _STATE["path"] is None:
+        return
+    residual = np.atleast_1d(np.asarray(residual, dtype=np.float64))
+    iterations = np.broadcast_to(np.asarray(iterations, dtype=np.int64), residual.shape)
+    # Ngữ cảnh stage (row, alpha, ...) ghi trước để engine của kernel thật sự hội tụ không bị engine của khối ghi đè
+    base = _context()
+    base.update({"kind": "convergence", "engine": engine, "pid": os.getpid(), "TOL": TOL, "MAX_ITER": MAX_ITER})
+    _write([dict(base, iterations=int(it), residual=float(res), converged=bool(res < TOL))
+            for it, res in zip(iterations.tolist(), residual.tolist())])
+
+# ✅ Dùng trong task của worker: bật trace theo đường dẫn tiến trình chính truyền sang
+def attach_trace(path):
+    if path is not None:
+        enable_profiling(path)
+
+# ✅ Đọc trace → (bảng stage, bảng convergence)
+def load_trace(path):
+    stages, convergence = [], []
+    with open(path) as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # dòng ghi dở
+            record = json.loads(line)
+            (stages if record["kind"] == "stage" else convergence).append(record)
+    return pd.DataFrame(stages), pd.DataFrame(convergence)
+
+# ✅ Gom trace: thời gian theo giai đoạn (giảm dần) và phân bố số bước hội tụ theo engine
+def summarize_trace(path):
+    stages, convergence = load_trace(path)
+
+    stage_summary = pd.DataFrame(columns=["name", "calls", "wall_total_s", "wall_mean_s", "cpu_total_s",
+                                          "peak_mb_max"])
+    if len(stages):
+        stage_summary = (
+            stages.groupby("name")
+            .agg(calls=("wall_s", "size"), wall_total_s=("wall_s", "sum"), wall_mean_s=("wall_s", "mean"),
+                 cpu_total_s=("cpu_s", "sum"), peak_mb_max=("peak_mb", "max"))
+            .sort_values("wall_total_s", ascending=False)
+            .reset_index()
+        )
+
+    conv_summary = pd.DataFrame(columns=["engine", "MAX_ITER", "TOL", "rounds", "iter_mean", "iter_p50",
+                                         "iter_p95", "iter_max", "not_converged", "residual_p50",
+                                         "residual_p95", "residual_max"])
+    if len(convergence):
+        conv_summary = (
+            convergence.groupby(["engine", "MAX_ITER", "TOL"])
+            .agg(rounds=("iterations", "size"), iter_mean=("iterations", "mean"),
+                 iter_p50=("iterations", "median"), iter_p95=("iterations", lambda s: s.quantile(0.95)),
+                 iter_max=("iterations", "max"), not_converged=("converged", lambda s: int((~s).sum())),
+                 residual_p50=("residual", "median"), residual_p95=("residual", lambda s: s.quantile(0.95)),
+                 residual_max=("residual", "max"))
+            .reset_index()
+        )
+    return stage_summary, conv_summary
+
+# ✅ Bật tự động qua biến môi trường (worker joblib mới sinh cũng nhận được)
+if os.environ.get(PROFILE_ENV):
+    enable_profiling(os.environ[PROFILE_ENV])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tổng hợp trace profiling (JSON lines)")
+    parser.add_argument("trace_path")
+    parser.add_argument("-o", "--output-prefix", default=None, help="ghi thêm <prefix>_stages.csv, <prefix>_convergence.csv")
+    args = parser.parse_args()
+
+    stage_summary, conv_summary = summarize_trace(args.trace_path)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print("⏱️ Giai đoạn (theo tổng wall time):")
+        print(stage_summary.to_string(index=False))
+        print("\n🔁 Hội tụ theo engine:")
+        print(conv_summary.to_string(index=False))
+    if args.output_prefix:
+        stage_summary.to_csv(args.output_prefix + "_stages.csv", index=False)
+        conv_summary.to_csv(args.output_prefix + "_convergence.csv", index=False)
+        print(f"✅ Đã lưu {args.output_prefix}_stages.csv, {args.output_prefix}_convergence.csv")
@@ -0,0 +1,96 @@
+# ✅ Reachability.py — Chỉ mục "từ node này tới được bao nhiêu node" dựng 1 lần cho mỗi đồ thị
+# ✅ trên đồ thị ngưng tụ (condensation) các thành phần liên thông mạnh (SCC): mọi node cùng SCC tới được
+# ✅ cùng 1 tập node, nên chỉ cần tập hậu duệ của từng SCC (bitset theo thứ tự topo ngược khi đủ nhỏ,
+# ✅ không thì BFS trên đồ thị ngưng tụ) thay cho nx.descendants trên đồ thị gốc ở mỗi lần thử.
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, breadth_first_order
+
+MAX_BITSET_COMPONENTS = 20000  # bitset hậu duệ tốn C²/8 byte (20000 SCC ≈ 50 MB)
+
+class ReachabilityIndex:
+    def __init__(self, G: nx.DiGraph, max_bitset_components=MAX_BITSET_COMPONENTS):
+        self.nodes = list(G.nodes())
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        A = nx.to_scipy_sparse_array(G, nodelist=self.nodes, weight=None, format="csr")
+        self.n_components, self.labels = connected_components(A, directed=True, connection="strong")
+        self.sizes = np.bincount(self.labels, minlength=self.n_components)
+
+        # Cạnh giữa các SCC (bỏ cạnh trong cùng SCC, gộp cạnh trùng; kiểu bool để gộp bao nhiêu cạnh
+        # trùng cũng vẫn là True — int8 tràn về 0 khi đủ 256 cạnh trùng và làm mất cạnh)
+        coo = A.tocoo()
+        cu, cv = self.labels[coo.row], self.labels[coo.col]
+        keep = cu != cv
+        C = sp.csr_matrix((np.ones(int(keep.sum()), dtype=bool), (cu[keep], cv[keep])),
+                          shape=(self.n_components, self.n_components))
+        C.sum_duplicates()
+        self.condensation = C
+
+        self.descendants = None
+        if self.n_components <= max_bitset_components:
+            self.descendants = self._descendant_bitsets()
+
+        # Cache theo lượt chọn: số node chưa loại tới được từ mỗi SCC, và các SCC đã biết là < d
+        self._excluded = None
+        self._weights = None
+        self._counts = {}
+        self._below = (None, set())
+
+    # ✅ Bitset hậu duệ (kể cả chính nó) của từng SCC, dựng theo thứ tự topo ngược của đồ thị ngưng tụ
+    def _descendant_bitsets(self):
+        dag = nx.DiGraph()
+        dag.add_nodes_from(range(self.n_components))
+        dag.add_edges_from(zip(*(idx.tolist() for idx in self.condensation.nonzero())))
+        order = list(nx.topological_sort(dag))
+        rows = np.zeros((self.n_components, (self.n_components + 7) // 8), dtype=np.uint8)
+        own = np.arange(self.n_components)
+        rows[own, own >> 3] = (0x80 >> (own & 7)).astype(np.uint8)
+        indptr, indices = self.condensation.indptr, self.condensation.indices
+        for c in reversed(order):
+            succ = indices[indptr[c]:indptr[c + 1]]
+            if len(succ):
+                rows[c] |= np.bitwise_or.reduce(rows[succ], axis=0)
+        return rows
+
+    # ✅ Mặt nạ các SCC tới được từ SCC c (kể cả c)
+    def component_mask(self, c):
+        if self.descendants is not None:
+            return np.unpackbits(self.descendants[c], count=self.n_components).astype(bool)
+        mask = np.zeros(self.n_components, dtype=bool)
+        mask[breadth_first_order(self.condensation, c, directed=True, return_predecessors=False)] = True
+        return mask
+
+    # ✅ Đặt tập node đã loại cho các truy vấn tiếp theo (gọi 1 lần mỗi lượt chọn target)
+    def set_excluded(self, excluded_nodes):
+        # Tập loại chỉ lớn dần qua các lượt → SCC đã thiếu node trước đó vẫn thiếu; khác kiểu đó thì bỏ cache
+        previous = self._excluded
+        self._excluded = set(excluded_nodes)
+        if previous is None or not previous <= self._excluded:
+            self._below = (None, set())
+        excluded = np.zeros(len(self.nodes), dtype=bool)
+        excluded[[self.node_index[v] for v in self._excluded if v in self.node_index]] = True
+        self._weights = np.bincount(self.labels, weights=~excluded, minlength=self.n_components)
+        self._counts = {}
+
+    # ✅ len(({start} ∪ descendants(start)) - excluded_nodes), không duyệt lại đồ thị gốc
+    def reach_count(self, start):
+        c = self.labels[self.node_index[start]]
+        if c not in self._counts:
+            self._counts[c] = int(self._weights[self.component_mask(c)].sum())
+        return self._counts[c]
+
+    # ✅ start có tới được ≥ d node chưa loại không (nhớ các SCC đã thiếu qua các lượt)
+    def reaches_at_least(self, start, d):
+        c = self.labels[self.node_index[start]]
+        below_d, below = self._below
+        if below_d != d:
+            below = set()
+            self._below = (d, below)
+        if c in below:
+            return False
+        if self.reach_count(start) >= d:
+            return True
+        below.add(c)
+        return False
@@ -0,0 +1,115 @@
+# ✅ Scheduler.py — Lập lịch toàn cục cho Phase 2: mọi task (dòng, khối alpha) của cả file chạy trên 1 pool
+# ✅ worker dùng lâu dài (không dựng Parallel mới cho từng dòng, không chờ dòng trước xong mới chạy dòng sau).
+# ✅ Khối alpha được cắt theo chi phí ước lượng (số lượt Beta × kích thước vùng lan tới của alpha),
+# ✅ khối nặng chạy trước (LPT) để các lõi luôn bận tới cuối file.
+
+import numpy as np
+from joblib import Parallel, delayed
+from multiprocessing import cpu_count
+from scipy.sparse.csgraph import connected_components
+from Simulate.Sparse_Engine import reachable_from
+from Simulate.Pair_Set import resolve_drivers
+
+CHUNKS_PER_WORKER = 4  # số khối trung bình mỗi worker (engine 1 alpha / lần); engine batched dùng 1
+
+# ✅ Số worker: None / 0 = nửa số lõi (như trước), âm = theo quy ước joblib (-1 = mọi lõi)
+def resolve_n_jobs(n_jobs=None):
+    if not n_jobs:
+        return max(1, cpu_count() // 2)
+    if n_jobs < 0:
+        return max(1, cpu_count() + 1 + n_jobs)
+    return int(n_jobs)
+
+# ✅ Số node lan tới được từ từng alpha; các node cùng thành phần liên thông mạnh có chung kết quả
+def reach_sizes(op, alpha_idx):
+    _, labels = connected_components(op.out_edges(), directed=True, connection="strong")
+    by_component = {}
+    sizes = np.empty(len(alpha_idx), dtype=np.int64)
+    for i, a in enumerate(alpha_idx):
+        label = labels[a]
+        if label not in by_component:
+            by_component[label] = int(np.count_nonzero(reachable_from(op, [a])))
+        sizes[i] = by_component[label]
+    return sizes
+
+# ✅ Số lượt Beta của 1 dòng (mỗi lượt gắn tối đa N_BETA driver)
+def beta_rounds(drivers, N_BETA):
+    return max(1, -(-len(drivers) // N_BETA))
+
+# ✅ Chi phí 1 lượt của từng alpha trong 1 dòng (đơn vị: số node được cập nhật); alpha không có trong mạng ≈ 0
+# ✅ Không phụ thuộc N_BETA nên sweep tính 1 lần cho mỗi dòng rồi nhân với beta_rounds của từng điểm lưới
+def alpha_round_costs(op, drivers, alphas, engine):
+    if op is None:
+        return np.ones(len(alphas))
+    idx = [op.node_index.get(a) for a in alphas]
+    if engine != "frontier":
+        # Engine quét toàn bộ: mỗi lượt tốn như nhau với mọi alpha
+        return np.array([op.n if i is not None else 1.0 for i in idx], dtype=np.float64)
+    known = [i for i in idx if i is not None]
+    driver_idx = [op.node_index[d] for d in resolve_drivers(drivers) if d in op.node_index]
+    driver_reach = int(np.count_nonzero(reachable_from(op, driver_idx))) if driver_idx else 0
+    reach = dict(zip(known, reach_sizes(op, known))) if known else {}
+    return np.array([min(op.n, reach[i] + driver_reach) if i is not None else 1.0 for i in idx],
+                    dtype=np.float64)
+
+# ✅ Chi phí ước lượng của từng alpha trong 1 dòng (số lượt Beta × chi phí 1 lượt)
+def alpha_costs(op, drivers, alphas, N_BETA, engine):
+    return beta_rounds(drivers, N_BETA) * alpha_round_costs(op, drivers, alphas, engine)
+
+# ✅ Cắt các (dòng, alpha) còn phải chạy thành khối có chi phí gần bằng nhau, khối nặng xếp trước
+def plan_blocks(rows, op, engine, N_BETA, n_jobs, max_width=None, round_costs=None, with_cost=False):
+    """
+    rows: [(row_idx, drivers, alphas)] — alpha của mỗi dòng đã bỏ phần xong (checkpoint).
+    Trả về [(row_idx, alphas, drivers)] (with_cost=True: [(chi phí, row_idx, alphas, drivers)]).
+    Mỗi khối chỉ chứa alpha của 1 dòng (chung drivers); engine batched / steady còn bị giới hạn
+    bề rộng max_width (ngân sách bộ nhớ của ma trận n×k). round_costs: chi phí 1 lượt đã tính sẵn
+    cho từng dòng (alpha_round_costs), dùng lại khi lập khối nhiều lần trên cùng mạng.
+    """
+    batched = engine in ("batched", "steady")
+    if round_costs is None:
+        round_costs = [alpha_round_costs(op, drivers, alphas, engine) for _, drivers, alphas in rows]
+    costs = [beta_rounds(drivers, N_BETA) * c for (_, drivers, _), c in zip(rows, round_costs)]
+    total = sum(float(c.sum()) for c in costs)
+    if total == 0:
+        return []
+    target = total / (n_jobs * (1 if batched else CHUNKS_PER_WORKER))
+
+    blocks = []
+    for (row_idx, drivers, alphas), row_costs in zip(rows, costs):
+        block, block_cost = [], 0.0
+        for alpha, cost in zip(alphas, row_costs):
+            block.append(alpha)
+            block_cost += cost
+            if block_cost >= target or (max_width is not None and len(block) >= max_width):
+                blocks.append((block_cost, row_idx, block, drivers))
+                block, block_cost = [], 0.0
+        if block:
+            blocks.append((block_cost, row_idx, block, drivers))
+    blocks.sort(key=lambda b: -b[0])
+    if with_cost:
+        return blocks
+    return [(row_idx, block, drivers) for _, row_idx, block, drivers in blocks]
+
+# ✅ Pool worker dùng lâu dài: dùng "with WorkScheduler(n_jobs) as scheduler:" để mọi lần map chung 1 pool
+class WorkScheduler:
+    def __init__(self, n_jobs=None):
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self._parallel = None
+
+    def _new_parallel(self):
+        return Parallel(n_jobs=self.n_jobs, return_as="generator_unordered", batch_size=1)
+
+    def __enter__(self):
+        self._parallel = self._new_parallel()
+        self._parallel.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._parallel.__exit__(*exc)
+        self._parallel = None
+
+    # ✅ Chạy fn(*args) cho mọi task, trả về generator kết quả theo thứ tự hoàn thành
+    # ✅ (phải đọc hết generator trước lần map tiếp theo trên cùng pool)
+    def map(self, fn, tasks):
+        parallel = self._parallel if self._parallel is not None else self._new_parallel()
+        return parallel(delayed(fn)(*args) for args in tasks)
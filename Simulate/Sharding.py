@@ -0,0 +1,89 @@
+# ✅ Sharding.py — Chia 1 file cặp driver-target thành N shard cố định theo (dòng, alpha) để chạy Phase 2
+# ✅ trên nhiều máy (chỉ cần chung hệ thống file). Mỗi shard ghi file kết quả từng phần (Checkpoint.py)
+# ✅ + manifest JSON khi xong; functions/merged_csv.py kiểm tra đủ shard / đủ (dòng, alpha) rồi gộp lại
+# ✅ thành đúng bảng Alpha_Node, Total_Support của lần chạy 1 tiến trình.
+#
+# ✅ Chạy 1 shard (trên mỗi máy 1 chỉ số):
+#   python Simulate/Sharding.py network.txt pairs.csv --shard 0 --n-shards 4 --out shards/ --engine batched
+# ✅ Gộp:
+#   python functions/merged_csv.py pairs.csv shards/ -o result.csv
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import glob
+import json
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+# ✅ Shard của từng (dòng, alpha): xoay vòng theo thứ tự xuất hiện trong file cặp (không phụ thuộc máy / hash)
+def shard_assignment(rows, n_shards):
+    assignment = {}
+    for row_idx, _, targets in rows:
+        for alpha in targets:
+            key = (row_idx, alpha)
+            if key not in assignment:
+                assignment[key] = len(assignment) % n_shards
+    return assignment
+
+# ✅ Các dòng của 1 shard: [(row_idx, drivers, alpha thuộc shard)] (bỏ dòng rỗng)
+def shard_rows(rows, shard_index, n_shards):
+    if not 0 <= shard_index < n_shards:
+        raise ValueError(f"shard_index phải trong [0, {n_shards}), nhận {shard_index}")
+    assignment = shard_assignment(rows, n_shards)
+    selected = []
+    for row_idx, drivers, targets in rows:
+        mine = [alpha for alpha in targets if assignment[(row_idx, alpha)] == shard_index]
+        if mine:
+            selected.append((row_idx, drivers, mine))
+    return selected
+
+def shard_label(shard_index, n_shards):
+    return f"s{shard_index:03d}-of-{n_shards:03d}"
+
+# ✅ Manifest ghi cạnh file kết quả từng phần khi shard chạy xong
+def write_manifest(parts_path, info):
+    path = parts_path + MANIFEST_SUFFIX
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(info, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    return path
+
+def read_manifests(shard_dir, pair_csv_path):
+    base = os.path.splitext(os.path.basename(pair_csv_path))[0]
+    manifests = []
+    for path in sorted(glob.glob(os.path.join(shard_dir, glob.escape(base + "_") + "*" + MANIFEST_SUFFIX))):
+        with open(path) as f:
+            manifests.append(json.load(f))
+    return manifests
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chạy 1 shard Phase 2 của file cặp driver-target")
+    parser.add_argument("graph_path")
+    parser.add_argument("pair_csv_path")
+    parser.add_argument("--shard", type=int, required=True, help="chỉ số shard (0 … n_shards-1)")
+    parser.add_argument("--n-shards", type=int, required=True)
+    parser.add_argument("--out", required=True, help="thư mục chung chứa kết quả các shard")
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--delta", type=float, default=0.2)
+    parser.add_argument("--max-iter", type=int, default=10)
+    parser.add_argument("--tol", type=float, default=1e-3)
+    parser.add_argument("--n-beta", type=int, default=2)
+    parser.add_argument("--engine", default="sparse", choices=["sparse", "frontier", "batched", "steady", "dense"])
+    parser.add_argument("--precision", default="float64", choices=["float64", "float32", "auto"])
+    parser.add_argument("--memory-budget-mb", type=float, default=None)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    from Simulate.Phase2_Multi_Beta_Simulate_Pair import simulate_from_driver_target_file
+
+    args = _parse_args()
+    df = simulate_from_driver_target_file(args.graph_path, args.pair_csv_path, args.epsilon, args.delta,
+                                          args.max_iter, args.tol, args.n_beta, engine=args.engine,
+                                          precision=args.precision, memory_budget_mb=args.memory_budget_mb,
+                                          checkpoint_dir=args.out, n_jobs=args.n_jobs,
+                                          shard=(args.shard, args.n_shards))
+    print(f"✅ Shard {shard_label(args.shard, args.n_shards)}: {len(df)} kết quả trong {args.out}")
@@ -0,0 +1,119 @@
+# ✅ Shared_Graph.py — Đồ thị đã biên dịch dùng chung cho các worker joblib (không pickle G mỗi task)
+# ✅ Mảng chỉ số / trọng số / bảng tên node được ghi 1 lần ra file .npy (ưu tiên /dev/shm),
+# ✅ worker chỉ nhận handle (đường dẫn) và mở lại bằng memory-map.
+
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+import scipy.sparse as sp
+from Simulate.Sparse_Engine import NetworkOperator
+
+# ✅ Cache theo tiến trình: mỗi worker chỉ attach 1 lần cho mỗi handle (khoá = handle.key → (path, toán tử));
+# ✅ worker loky được dùng lại qua nhiều lần chạy nên entry của handle đã release (thư mục đã xoá)
+# ✅ được bỏ ở lần attach kế tiếp, không giữ memory-map của file /dev/shm đã xoá
+_ATTACHED = {}
+
+def _evict_released():
+    for key, (path, _) in list(_ATTACHED.items()):
+        if not os.path.isdir(path):
+            del _ATTACHED[key]
+
+def _shared_dir():
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# ✅ Handle gọn nhẹ: pickle chỉ gồm đường dẫn thư mục, kích thước và khoá riêng của lần publish
+class SharedGraphHandle:
+    def __init__(self, path, n, nnz):
+        self.path = path
+        self.n = n
+        self.nnz = nnz
+        self.key = uuid.uuid4().hex  # đường dẫn tạm có thể được dùng lại sau khi xoá
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+
+    # ✅ Mở lại toán tử mạng từ memory-map (dùng chung trang nhớ giữa các worker)
+    def operator(self):
+        entry = _ATTACHED.get(self.key)
+        if entry is None:
+            _evict_released()
+            shape = (self.n, self.n)
+            M = sp.csr_matrix((self._load("in_data"), self._load("in_indices"), self._load("in_indptr")),
+                              shape=shape, copy=False)
+            W = sp.csr_matrix((self._load("out_data"), self._load("out_indices"), self._load("out_indptr")),
+                              shape=shape, copy=False)
+            op = NetworkOperator(self._load("names").tolist(), M, self._load("in_weight"))
+            op._out_edges = W
+            entry = _ATTACHED[self.key] = (self.path, op)
+        return entry[1]
+
+    # ✅ Xoá file chia sẻ (gọi ở tiến trình chính khi đã chạy xong); worker tự bỏ entry ở lần attach sau
+    def release(self):
+        _ATTACHED.pop(self.key, None)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+# ✅ Ghi toán tử mạng ra bộ nhớ chia sẻ, trả về handle
+def publish_operator(op):
+    path = tempfile.mkdtemp(prefix="ocdm_graph_", dir=_shared_dir())
+    W = op.out_edges()
+    arrays = {
+        "in_indptr": op.M.indptr,
+        "in_indices": op.M.indices,
+        "in_data": op.M.data,
+        "in_weight": op.in_weight,
+        "out_indptr": W.indptr,
+        "out_indices": W.indices,
+        "out_data": W.data,
+        "names": np.array(op.node_order, dtype=str),
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(arr))
+    return SharedGraphHandle(path, op.n, op.M.nnz)
+
+# ✅ BFS không trọng số trên CSR cạnh ra, trả về mảng khoảng cách (-1 = không tới được)
+def bfs_distances(W, src, max_depth=None):
+    dist = np.full(W.shape[0], -1, dtype=np.int64)
+    dist[src] = 0
+    frontier = np.array([src], dtype=np.int64)
+    depth = 0
+    while len(frontier) and (max_depth is None or depth < max_depth):
+        depth += 1
+        nbrs = W[frontier].indices
+        nbrs = nbrs[dist[nbrs] < 0]
+        if len(nbrs) == 0:
+            break
+        dist[nbrs] = depth
+        nbrs.sort()
+        frontier = nbrs[np.concatenate(([True], nbrs[1:] != nbrs[:-1]))]
+    return dist
+
+# ✅ Khoảng cách từ mọi node tới từng target: 1 BFS ngược (trên CSR cạnh vào) cho mỗi target
+# ✅ D[i, src] = độ dài đường ngắn nhất src → target_indices[i] (-1 = không tới được)
+def reverse_distances(op, target_indices, max_depth=None, dtype=np.int32):
+    M = op.M  # hàng u = node nhận, chỉ số cột = node gửi → BFS trên M đi ngược chiều cạnh
+    D = np.empty((len(target_indices), op.n), dtype=dtype)
+    for i, t in enumerate(target_indices):
+        D[i] = bfs_distances(M, t, max_depth)
+    return D
+
+# ✅ Worker Phase 1: BFS từ 1 khối node nguồn trên đồ thị chia sẻ (chỉ nhận handle + chỉ số)
+def process_sources_shared(handle, src_indices, target_indices, max_depth=None):
+    op = handle.operator()
+    W = op.out_edges()
+    names = op.node_order
+    results = []
+    for src in src_indices:
+        dist = bfs_distances(W, src, max_depth)
+        H_src = {}
+        K_update = []
+        src_name = names[src]
+        for t in target_indices:
+            d = int(dist[t])
+            if d >= 0:
+                tgt = names[t]
+                H_src.setdefault(d, set()).add(tgt)
+                K_update.append((tgt, src_name, d))
+        results.append((src_name, H_src, K_update))
+    return results
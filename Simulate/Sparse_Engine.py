@@ -0,0 +1,569 @@
+# ✅ Sparse_Engine.py — Engine CSR cho Phase 2 (thay vòng lặp Python theo từng node)
+# ✅ Toán tử mạng dựng 1 lần cho mỗi đồ thị, Beta của mỗi lượt chỉ là lớp phủ nhỏ
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu, eigs, ArpackNoConvergence
+from Simulate.Profiler import record_convergence, profiling_enabled
+
+FRONTIER_DENSE_RATIO = 0.5  # tỉ lệ cạnh vào của node active mà từ đó engine frontier chuyển sang quét toàn bộ
+STATE_BUFFERS = 5  # số ma trận n×k cùng sống trong 1 khối batched: X, Xa, Xn, tổng theo cạnh, phần dư
+EDGE_BUFFERS = 2  # số ma trận nnz×k của EdgeFold.sums trong 1 khối batched (x[col], x[row])
+STEADY_SIGN_MARGIN = 10  # engine steady: |điểm dừng| phải lớn hơn bội số này của sai số còn lại khi vòng lặp dừng
+DENSE_EIG_MAX = 500  # hệ R tới cỡ này tính bán kính phổ bằng eigvals dense, lớn hơn dùng ARPACK
+
+# ✅ Toán tử mạng đã biên dịch: dùng chung (chỉ đọc) cho mọi lượt, mọi alpha
+class NetworkOperator:
+    """
+    M[u, v] = w(v→u) dạng CSR (hàng = node nhận), in_weight[u] = Σ_v w(v→u).
+    Một bước cập nhật của mạng gốc: x_u + ε·Σ_v M[u, v]·(x_v − x_u) (+ Beta), tính theo từng cạnh qua
+    edge_fold() để cộng đúng thứ tự như bản dense; T = ε·M + diag(1 − ε·in_weight) chỉ dùng cho
+    engine steady (giải điểm dừng).
+    """
+    def __init__(self, node_order, M, in_weight):
+        self.node_order = list(node_order)
+        self.node_index = {node: i for i, node in enumerate(self.node_order)}
+        self.M = M
+        self.in_weight = in_weight
+        self.n = len(self.node_order)
+        self.dtype = M.dtype
+        self._transition = {}
+        self._out_edges = None
+        self._fold = None
+
+    # ✅ Ma trận chuyển T theo ε (cache: mỗi ε chỉ dựng 1 lần)
+    def transition(self, EPSILON):
+        T = self._transition.get(EPSILON)
+        if T is None:
+            T = (EPSILON * self.M + sp.diags(1 - EPSILON * self.in_weight)).tocsr().astype(self.dtype, copy=False)
+            T.sort_indices()
+            self._transition[EPSILON] = T
+        return T
+
+    # ✅ Cấu trúc cộng theo cạnh cho mọi hàng (cache: dựng 1 lần cho mỗi toán tử)
+    def edge_fold(self):
+        if self._fold is None:
+            self._fold = EdgeFold(self.M)
+        return self._fold
+
+    def in_degree(self):
+        return np.diff(self.M.indptr)
+
+    # ✅ Ma trận cạnh ra W = Mᵀ (hàng = node nguồn), dùng cho duyệt xuôi
+    def out_edges(self):
+        if self._out_edges is None:
+            self._out_edges = self.M.T.tocsr()
+        return self._out_edges
+
+    # ✅ Bản sao với độ chính xác khác (float64 / float32), dùng chung bảng tên node
+    def astype(self, dtype):
+        dtype = np.dtype(dtype)
+        if dtype == self.dtype:
+            return self
+        op = NetworkOperator.__new__(NetworkOperator)
+        op.__dict__.update(self.__dict__)
+        op.M = self.M.astype(dtype)
+        op.in_weight = self.in_weight.astype(dtype)
+        op.dtype = dtype
+        op._transition = {}
+        op._fold = None
+        return op
+
+    # ✅ Số byte của toán tử (M, T, Mᵀ, EdgeFold và các vector n phần tử) nếu lưu với dtype
+    def nbytes(self, dtype=None):
+        nnz = self.M.nnz
+        item = np.dtype(dtype or self.dtype).itemsize
+        return 4 * (nnz + self.n) * (item + self.M.indices.itemsize) + 2 * self.n * item
+
+class EdgeFold:
+    """
+    Σ_v M[u, v]·(x_v − x_u) cho các hàng u trong rows, cộng từng cạnh theo thứ tự cột CSR — đúng thứ tự
+    neighbors[u] và phép cộng tuần tự sum(...) của update_states bản dense, nên kết quả trùng từng bit.
+    Mỗi cạnh e = (v → u) là 1 cột của P (P[u, e] = w_e), hiệu D[e] = x_v − x_u; P @ D là phép nhân CSR
+    của scipy (csr_matvec / csr_matvecs), cộng lần lượt từng phần tử của hàng từ trái sang như T @ x.
+    """
+    def __init__(self, M, rows=None):
+        if not M.has_sorted_indices:
+            M = M.sorted_indices()
+        indptr = M.indptr
+        self.rows = rows = np.arange(M.shape[0]) if rows is None else np.asarray(rows, dtype=np.int64)
+        self.full = len(rows) == M.shape[0] and np.array_equal(rows, np.arange(M.shape[0]))
+        deg = (indptr[rows + 1] - indptr[rows]).astype(np.int64)
+        local_indptr = np.concatenate(([0], np.cumsum(deg)))
+        m = int(local_indptr[-1])
+        edge = np.repeat(indptr[rows], deg) + np.arange(m) - np.repeat(local_indptr[:-1], deg)
+        self.row = np.repeat(rows, deg)
+        self.col = M.indices[edge].astype(np.int64)
+        self.P = sp.csr_matrix((M.data[edge], np.arange(m), local_indptr), shape=(len(rows), m))
+
+    @property
+    def nnz(self):
+        return self.P.nnz
+
+    # ✅ Ghi tổng theo cạnh của từng hàng vào out[rows]; x, out là vector n hoặc ma trận n×k
+    # ✅ work: 2 ma trận nnz×k dùng lại cho hiệu theo cạnh (None: cấp mới)
+    def sums(self, x, out, work=None):
+        if work is None:
+            D = x[self.col]
+            D -= x[self.row]
+        else:
+            D, E = work
+            np.take(x, self.col, axis=0, out=D, mode="clip")
+            np.take(x, self.row, axis=0, out=E, mode="clip")
+            np.subtract(D, E, out=D)
+        if self.full:
+            out[...] = self.P @ D
+        else:
+            out[self.rows] = self.P @ D
+        return out
+
+# ✅ Bộ đệm của 1 khối batched (tối đa width cột), cấp 1 lần và dùng lại ở mọi bước, mọi lượt Beta
+class BatchBuffers:
+    """
+    2 ma trận trạng thái n×k (Xa / Xn đổi vai mỗi bước), tổng theo cạnh n×k, hiệu theo cạnh 2 × nnz×k và
+    phần dư k×(n + n_beta). Mỗi bộ đệm là mảng phẳng; các hàm lấy view k cột đầu dưới dạng mảng liên tục
+    nên khối thu nhỏ theo số cột chưa hội tụ mà không cấp lại.
+    """
+    def __init__(self, op, width):
+        self.n = op.n
+        self.nnz = op.edge_fold().nnz
+        self.dtype = op.dtype
+        self._states = [np.empty(self.n * width, self.dtype), np.empty(self.n * width, self.dtype)]
+        self._total = np.empty(self.n * width, self.dtype)
+        self._edges = [np.empty(self.nnz * width, self.dtype) for _ in range(EDGE_BUFFERS)]
+        self._residual = np.empty(0, self.dtype)
+
+    def state(self, i, k):
+        return _view(self._states[i], self.n, k)
+
+    def total(self, k):
+        return _view(self._total, self.n, k)
+
+    def edges(self, k):
+        return [_view(buf, self.nnz, k) for buf in self._edges]
+
+    # Phần dư k×(n + n_beta), n_beta đổi theo nhóm Beta: cấp lại chỉ khi cần lớn hơn
+    def residual(self, k, n_beta):
+        size = k * (self.n + n_beta)
+        if self._residual.size < size:
+            self._residual = np.empty(size, self.dtype)
+        return _view(self._residual, k, self.n + n_beta)
+
+def _view(flat, rows, cols):
+    return flat[:rows * cols].reshape(rows, cols)
+
+# ✅ Nhận toán tử trực tiếp hoặc qua handle bộ nhớ chia sẻ (Shared_Graph.SharedGraphHandle)
+def resolve_operator(op):
+    return op if isinstance(op, NetworkOperator) else op.operator()
+
+# ✅ Dựng toán tử CSR từ đồ thị networkx (1 lần cho mỗi file mạng)
+def build_network_operator(G, node_order=None, dtype=np.float64):
+    if node_order is None:
+        node_order = list(G.nodes())
+    node_index = {node: i for i, node in enumerate(node_order)}
+    n = len(node_order)
+
+    rows, cols, vals = [], [], []
+    for u, v, d in G.edges(data=True):
+        rows.append(node_index[v])
+        cols.append(node_index[u])
+        vals.append(d.get("weight", 1.0))
+
+    M = sp.csr_matrix((vals, (rows, cols)), shape=(n, n), dtype=dtype)
+    in_weight = np.asarray(M.sum(axis=1)).ravel()
+    return NetworkOperator(node_order, M, in_weight)
+
+# ✅ Lớp phủ Beta của 1 lượt: các node được gắn Beta và số Beta gắn vào mỗi node
+def attach_betas(op, beta_nodes):
+    idx = np.fromiter((op.node_index[b] for b in beta_nodes), dtype=np.int64, count=len(beta_nodes))
+    attach_idx, attach_count = np.unique(idx, return_counts=True)
+    return attach_idx, attach_count.astype(op.dtype)
+
+# ✅ Một bước cập nhật như update_states bản dense, cho các hàng thuộc folds (hàng khác có tổng cạnh = 0):
+# ✅ x_u + ε·(Σ cạnh + Σ_Beta (x_Beta − x_u)) + δ·Σ_Beta (x_Beta − x_u), Beta cố định ở −1 nối vào u trọng số 1
+# ✅ (trong bản dense Beta vừa là hàng xóm cuối của u, vừa có hạng tử δ riêng); x là vector n hoặc ma trận n×k
+# ✅ buffers (BatchBuffers) + out: ghi kết quả vào out, mọi mảng tạm lấy từ bộ đệm của khối
+def _fold_step(folds, x, attach_idx, attach_count, EPSILON, DELTA, clip, buffers=None, out=None):
+    if buffers is None:
+        total, work = np.zeros_like(x), None
+    else:
+        total, work = buffers.total(x.shape[1]), buffers.edges(x.shape[1])
+        if not (len(folds) == 1 and folds[0].full):
+            total.fill(0)
+    for fold in folds:
+        fold.sums(x, total, work)
+    pull = -1 - x[attach_idx]
+    beta_sum = np.zeros_like(pull)
+    # Node gắn nhiều Beta: cộng lần lượt từng Beta như vòng sum(...) của bản dense
+    for j in range(int(attach_count.max()) if len(attach_count) else 0):
+        hit = attach_count > j
+        total[attach_idx[hit]] += pull[hit]
+        beta_sum[hit] += pull[hit]
+    if out is None:
+        out = x + EPSILON * total
+    else:
+        np.multiply(total, EPSILON, out=out)
+        np.add(x, out, out=out)
+    out[attach_idx] += DELTA * beta_sum
+    if clip is not None:
+        np.clip(out, -clip, clip, out=out)
+    return out
+
+# ✅ ‖x_new − x‖ như bản dense: vector trạng thái dense còn n_beta phần tử Beta (hiệu = 0) ở cuối;
+# ✅ giữ cùng độ dài để phép dot cộng theo cùng thứ tự, so với TOL cho cùng kết quả
+def _residual(diff, n_beta):
+    return np.linalg.norm(np.concatenate((diff, np.zeros(n_beta, dtype=diff.dtype))))
+
+# ✅ Bản nhiều cột: hiệu ghi thẳng vào hàng k×(n + n_beta) (liên tục, đuôi 0); np.vecdot gọi đúng hàm dot của
+# ✅ numpy (BLAS) cho từng hàng như norm của bản dense, nên cùng thứ tự cộng mà không cần vòng Python
+def _column_residuals(Xn, Xa, n_beta, buffers=None):
+    n, k = Xn.shape
+    if buffers is None:
+        padded = np.empty((k, n + n_beta), dtype=Xn.dtype)
+    else:
+        padded = buffers.residual(k, n_beta)
+    np.subtract(Xn.T, Xa.T, out=padded[:, :n])
+    padded[:, n:] = 0
+    return np.sqrt(np.vecdot(padded, padded))
+
+# ✅ Một bước cập nhật trên toàn mạng (trùng từng bit với update_states bản dense ở float64)
+def sparse_update_states(x, op, attach_idx, attach_count, EPSILON, DELTA, clip=1000):
+    return _fold_step([op.edge_fold()], x, attach_idx, attach_count, EPSILON, DELTA, clip)
+
+# ✅ Mở rộng tập node active thêm các node kề ra của frontier; trả về frontier mới
+def _grow_frontier(op, live, frontier):
+    if len(frontier) == 0:
+        return frontier
+    nbrs = op.out_edges()[frontier].indices
+    new = np.zeros(len(live), dtype=bool)
+    new[nbrs[~live[nbrs]]] = True
+    live |= new
+    return np.flatnonzero(new)
+
+# ✅ Lặp chỉ trên các node có thể khác 0 (frontier), kết quả trùng từng bit với bản quét toàn bộ
+def iterate_to_convergence_frontier(op, x0, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL, clip=1000):
+    """
+    Sau k bước, x chỉ có thể khác 0 tại các node cách (giá trị ≠ 0 ban đầu ∪ node gắn Beta)
+    không quá k cạnh; hàng ngoài tập đó có tổng cạnh = 0 nên không cần cộng. Cấu trúc cộng theo cạnh
+    chỉ dựng thêm cho các hàng mới vào tập (mỗi đợt 1 EdgeFold, các đợt rời nhau nên thứ tự cộng
+    trong từng hàng giữ nguyên); khi cạnh vào của tập đã chiếm FRONTIER_DENSE_RATIO số cạnh
+    thì dùng luôn cấu trúc toàn mạng của toán tử.
+    """
+    x = np.array(x0, dtype=op.dtype)
+    n_beta = int(attach_count.sum())
+    in_degree = op.in_degree()
+    live = x != 0
+    live[attach_idx] = True
+    frontier = np.flatnonzero(live)
+    live_edges = int(in_degree[frontier].sum())
+    full = live_edges > FRONTIER_DENSE_RATIO * op.M.nnz
+    folds = [op.edge_fold()] if full else [EdgeFold(op.M, frontier)]
+    it, residual = 0, np.nan
+
+    for it in range(1, MAX_ITER + 1):
+        if not full:
+            frontier = _grow_frontier(op, live, frontier)
+            if len(frontier):
+                live_edges += int(in_degree[frontier].sum())
+                full = live_edges > FRONTIER_DENSE_RATIO * op.M.nnz
+                folds = [op.edge_fold()] if full else folds + [EdgeFold(op.M, frontier)]
+        x_new = _fold_step(folds, x, attach_idx, attach_count, EPSILON, DELTA, clip)
+        residual = _residual(x_new - x, n_beta)
+        if residual < TOL:
+            break
+        x = x_new
+
+    record_convergence("frontier", it, residual, TOL, MAX_ITER)
+    return x
+
+# ✅ Lặp tới hội tụ (giữ nguyên quy ước trả về trạng thái trước bước cuối)
+def iterate_to_convergence(op, x0, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL, clip=1000):
+    x = np.array(x0, dtype=op.dtype)
+    n_beta = int(attach_count.sum())
+    it, residual = 0, np.nan
+
+    for it in range(1, MAX_ITER + 1):
+        x_new = sparse_update_states(x, op, attach_idx, attach_count, EPSILON, DELTA, clip)
+        residual = _residual(x_new - x, n_beta)
+        if residual < TOL:
+            break
+        x = x_new
+
+    record_convergence("sparse", it, residual, TOL, MAX_ITER)
+    return x
+
+# ✅ Mô phỏng 1 lượt gán beta vào driver trên toán tử dùng chung
+def simulate_one_round_sparse(op, beta_nodes, x_prev, EPSILON, DELTA, MAX_ITER, TOL, frontier=False):
+    attach_idx, attach_count = attach_betas(op, beta_nodes)
+    iterate = iterate_to_convergence_frontier if frontier else iterate_to_convergence
+    return iterate(op, x_prev, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL)
+
+# ✅ Tổng hỗ trợ (vector hoá)
+def compute_total_support_sparse(x_state, alpha_idx):
+    pos = np.count_nonzero(x_state > 0) - (x_state[alpha_idx] > 0)
+    neg = np.count_nonzero(x_state < 0) - (x_state[alpha_idx] < 0)
+    return int(pos - neg)
+
+# ✅ Mô phỏng cho 1 alpha node (engine CSR)
+def simulate_one_alpha_sparse(alpha_node, op, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, frontier=False):
+    op = resolve_operator(op)
+    if alpha_node not in op.node_index:
+        return None
+    alpha_idx = op.node_index[alpha_node]
+    x_state = np.zeros(op.n, dtype=op.dtype)
+    x_state[alpha_idx] = 1
+
+    for i in range(0, len(drivers), N_BETA):
+        beta_group = drivers[i:i + N_BETA]
+        if alpha_node in beta_group:
+            continue
+        x_state = simulate_one_round_sparse(op, beta_group, x_state, EPSILON, DELTA, MAX_ITER, TOL, frontier)
+
+    support = compute_total_support_sparse(x_state, alpha_idx)
+    return {"Alpha_Node": alpha_node, "Total_Support": support}
+
+# ✅ Một bước cập nhật cho ma trận trạng thái n×k (mỗi cột là 1 alpha), từng cột như sparse_update_states
+def sparse_update_states_batch(X, op, attach_idx, attach_count, EPSILON, DELTA, clip=1000, buffers=None, out=None):
+    return _fold_step([op.edge_fold()], X, attach_idx, attach_count, EPSILON, DELTA, clip, buffers, out)
+
+# ✅ Lặp tới hội tụ cho các cột active của X (ghi đè tại chỗ); cột đã hội tụ được loại khỏi phép nhân
+# ✅ buffers: bộ đệm dùng chung của khối (None: cấp cho riêng lượt này); Xa / Xn đổi vai giữa 2 bộ đệm trạng thái
+def iterate_batch_to_convergence(op, X, active, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL, clip=1000,
+                                 buffers=None):
+    active = np.asarray(active, dtype=np.int64)
+    if len(active) == 0:
+        return X
+    if buffers is None:
+        buffers = BatchBuffers(op, len(active))
+    cur = 0
+    Xa = buffers.state(cur, len(active))
+    np.take(X, active, axis=1, out=Xa, mode="clip")
+    n_beta = int(attach_count.sum())
+    norms = np.full(len(active), np.nan)
+
+    for it in range(1, MAX_ITER + 1):
+        Xn = sparse_update_states_batch(Xa, op, attach_idx, attach_count, EPSILON, DELTA, clip, buffers,
+                                        buffers.state(1 - cur, len(active)))
+        norms = _column_residuals(Xn, Xa, n_beta, buffers)
+        converged = norms < TOL
+        if converged.any():
+            record_convergence("batched", it, norms[converged], TOL, MAX_ITER)
+            # ✅ Cột hội tụ giữ trạng thái trước bước cuối (giống bản 1 alpha)
+            X[:, active[converged]] = Xa[:, converged]
+            keep = np.flatnonzero(~converged)
+            active = active[keep]
+            if len(active) == 0:
+                return X
+            # Cột còn lại dồn về đầu bộ đệm của Xa cũ (đã chép xong phần cần giữ)
+            Xa = buffers.state(cur, len(active))
+            np.take(Xn, keep, axis=1, out=Xa, mode="clip")
+            norms = norms[keep]
+        else:
+            Xa = Xn
+            cur = 1 - cur
+
+    record_convergence("batched", MAX_ITER, norms, TOL, MAX_ITER)
+    X[:, active] = Xa
+    return X
+
+# ✅ Mô phỏng cả một nhóm alpha cùng dòng driver-target dưới dạng ma trận trạng thái n×k
+def simulate_alphas_batched(alpha_nodes, op, drivers, EPSILON, DELTA, MAX_ITER, TOL, N_BETA, steady_state=False,
+                            batch_size=None):
+    op = resolve_operator(op)
+    alphas = [a for a in alpha_nodes if a in op.node_index]
+    if not alphas:
+        return []
+    # ✅ Giới hạn bề rộng ma trận trạng thái (theo ngân sách bộ nhớ): chạy tuần tự từng khối
+    if batch_size is not None and len(alphas) > batch_size:
+        results = []
+        for i in range(0, len(alphas), batch_size):
+            results.extend(simulate_alphas_batched(alphas[i:i + batch_size], op, drivers, EPSILON, DELTA,
+                                                   MAX_ITER, TOL, N_BETA, steady_state))
+        return results
+    alpha_idx = np.array([op.node_index[a] for a in alphas], dtype=np.int64)
+    X = np.zeros((op.n, len(alphas)), dtype=op.dtype)
+    X[alpha_idx, np.arange(len(alphas))] = 1
+    buffers = BatchBuffers(op, len(alphas))
+
+    for i in range(0, len(drivers), N_BETA):
+        beta_group = drivers[i:i + N_BETA]
+        group_set = set(beta_group)
+        # ✅ Alpha nằm trong nhóm Beta thì bỏ qua lượt này (xử lý theo từng cột)
+        active = [j for j, a in enumerate(alphas) if a not in group_set]
+        attach_idx, attach_count = attach_betas(op, beta_group)
+        if steady_state and active:
+            # ✅ 1 lần phân rã cho nhóm Beta này, dùng lại cho mọi alpha (cột) của khối
+            # ✅ Cột không chắc trùng kết quả vòng lặp (hoặc hệ không co rút) đi tiếp đường lặp batched
+            factor = factorize_steady_state(op, attach_idx, attach_count, EPSILON, DELTA)
+            if factor is not None:
+                remaining = solve_steady_state(factor, X, active, MAX_ITER, TOL)
+                solved = np.setdiff1d(active, remaining)
+                if profiling_enabled() and len(solved):
+                    # Phần dư của điểm dừng = độ dịch chuyển nếu lặp thêm 1 bước
+                    Xa = X[:, solved]
+                    diff = sparse_update_states_batch(Xa, op, attach_idx, attach_count, EPSILON, DELTA) - Xa
+                    record_convergence("steady", 0, np.sqrt(np.einsum("ij,ij->j", diff, diff)), TOL, MAX_ITER)
+                active = remaining
+        iterate_batch_to_convergence(op, X, active, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL,
+                                     buffers=buffers)
+
+    return [
+        {"Alpha_Node": a, "Total_Support": compute_total_support_sparse(X[:, j], alpha_idx[j])}
+        for j, a in enumerate(alphas)
+    ]
+
+# ✅ Tập node nhận được ảnh hưởng (đi xuôi theo cạnh) từ các node seeds
+def reachable_from(op, seeds):
+    reached = np.zeros(op.n, dtype=bool)
+    reached[seeds] = True
+    frontier = np.flatnonzero(reached)
+    while len(frontier):
+        frontier = _grow_frontier(op, reached, frontier)
+    return reached
+
+# ✅ Phép lặp trên R là x_R ← B x_R + (hằng), B = T_RR − diag(c_R). Mọi hàng Σ|B[u, :]| ≤ 1 và hàng gắn Beta < 1
+# ✅ (mọi node của R lần ngược theo cạnh vào đều tới 1 node gắn Beta) ⇒ bán kính phổ của B < 1: vòng lặp hội tụ
+# ✅ về đúng điểm dừng và không chạm ngưỡng clip. Với ε·in_weight lớn (hub) hệ số chéo 1 − ε·in_weight − (ε+δ)c
+# ✅ âm, vòng lặp dao động / phân kỳ và bị clip ở ±1000 nên điểm dừng không còn nghĩa
+def _contractive(B, attach_rows):
+    row_abs = np.asarray(abs(B).sum(axis=1)).ravel()
+    slack = 8 * np.finfo(B.dtype).eps
+    return bool((row_abs <= 1 + slack).all() and (row_abs[attach_rows] < 1).all())
+
+# ✅ Bán kính phổ của B (tốc độ hội tụ của vòng lặp); None nếu ARPACK không hội tụ
+def _spectral_radius(B):
+    if B.shape[0] <= DENSE_EIG_MAX:
+        return float(np.abs(np.linalg.eigvals(B.toarray())).max(initial=0))
+    try:
+        return float(np.abs(eigs(B.astype(np.float64), k=1, which="LM", return_eigenvectors=False)).max())
+    except ArpackNoConvergence:
+        return None
+
+# ✅ Phân rã hệ rút gọn của điểm dừng cho 1 nhóm Beta
+def factorize_steady_state(op, attach_idx, attach_count, EPSILON, DELTA):
+    """
+    Điểm dừng của x ← T x − (ε+δ)·c·(1 + x) thoả (I − T + (ε+δ)C) x = −(ε+δ)c.
+    Chỉ các node R nhận ảnh hưởng từ Beta có hệ xác định; phần còn lại U không
+    phụ thuộc Beta (đồng thuận thuần tuý, hệ suy biến) nên vẫn đi đường lặp.
+    Điểm dừng chỉ là kết quả của vòng lặp khi phép lặp trên R co rút (xem _contractive);
+    trả về None nếu không co rút hoặc hệ suy biến (khi đó gọi lại đường lặp).
+    """
+    in_R = reachable_from(op, attach_idx)
+    R = np.flatnonzero(in_R)
+    U = np.flatnonzero(~in_R)
+    T = op.transition(EPSILON)
+
+    c_R = np.zeros(op.n, dtype=op.dtype)
+    c_R[attach_idx] = (EPSILON + DELTA) * attach_count
+    c_R = c_R[R]
+    T_RR = T[R][:, R]
+    B = (T_RR - sp.diags(c_R)).tocsr()
+    if not _contractive(B, np.searchsorted(R, attach_idx)):
+        return None
+    rho = _spectral_radius(B)
+    if rho is None or rho >= 1:
+        return None
+    A_RR = (sp.identity(len(R), format="csr") - B).tocsc()
+    try:
+        lu = splu(A_RR)
+    except RuntimeError:
+        return None
+
+    return {
+        "R": R,
+        "U": U,
+        "lu": lu,
+        "c_R": c_R,
+        "rho": rho,
+        "T_RU": T[R][:, U],
+        "T_UU": T[U][:, U],
+    }
+
+# ✅ Lặp riêng khối U (không có Beta) tới hội tụ theo từng cột
+def _iterate_block(T, XB, MAX_ITER, TOL, clip=1000):
+    out = XB.copy()
+    active = np.arange(XB.shape[1])
+    Xa = XB
+    for _ in range(MAX_ITER):
+        Xn = T @ Xa
+        np.clip(Xn, -clip, clip, out=Xn)
+        diff = Xn - Xa
+        converged = np.sqrt(np.einsum("ij,ij->j", diff, diff)) < TOL
+        if converged.any():
+            out[:, active[converged]] = Xa[:, converged]
+            active = active[~converged]
+            if len(active) == 0:
+                return out
+            Xa = Xn[:, ~converged]
+        else:
+            Xa = Xn
+    out[:, active] = Xa
+    return out
+
+# ✅ Cột nào của điểm dừng cho cùng dấu với vòng lặp dừng theo MAX_ITER / TOL
+def _matches_iteration(factor, XR0, XR, XU, MAX_ITER, TOL, clip):
+    """
+    Vòng lặp dừng khi bước < TOL, lúc đó còn cách điểm dừng khoảng TOL / (1 − ρ); từ sai số ban đầu e0
+    cần chừng log(e0 / sai số đó) / log(1 / ρ) bước. Chỉ nhận cột đạt được trong MAX_ITER bước và mọi phần tử
+    khác 0 của điểm dừng (R) / khối U đã lặp xa 0 hơn STEADY_SIGN_MARGIN lần sai số còn lại (dấu không đổi);
+    khối U còn phải đứng yên về dấu khi lặp thêm 1 bước.
+    """
+    rho = factor["rho"]
+    settle = TOL / (1 - rho)
+    e0 = np.sqrt(np.einsum("ij,ij->j", XR0 - XR, XR0 - XR))
+    with np.errstate(divide="ignore"):
+        steps = np.log(np.maximum(e0, settle) / settle) / -np.log(rho)
+    margin = STEADY_SIGN_MARGIN * settle
+    ok = np.isfinite(XR).all(axis=0) & (np.abs(XR) <= clip).all(axis=0) & (steps <= MAX_ITER)
+    ok &= (np.abs(XR) > margin).all(axis=0)
+    if XU.any():
+        ok &= ((XU == 0) | (np.abs(XU) > margin)).all(axis=0)
+        ok &= (np.sign(factor["T_UU"] @ XU) == np.sign(XU)).all(axis=0)
+    return ok
+
+# ✅ Giải điểm dừng cho các cột active của X bằng phân rã đã có (chỉ vế phải thay đổi);
+# ✅ trả về các cột chưa giải (không chắc trùng vòng lặp) để đi đường lặp
+def solve_steady_state(factor, X, active, MAX_ITER, TOL, clip=1000):
+    active = np.asarray(active, dtype=np.int64)
+    R, U = factor["R"], factor["U"]
+    XU = X[np.ix_(U, active)]
+    if XU.any():
+        XU = _iterate_block(factor["T_UU"], XU, MAX_ITER, TOL)
+    rhs = factor["T_RU"] @ XU - factor["c_R"][:, None]
+    XR = factor["lu"].solve(rhs)
+    ok = _matches_iteration(factor, X[np.ix_(R, active)], XR, XU, MAX_ITER, TOL, clip)
+    X[np.ix_(U, active[ok])] = XU[:, ok]
+    X[np.ix_(R, active[ok])] = XR[:, ok]
+    return active[~ok]
+
+# ✅ Chọn dtype và bề rộng khối alpha sao cho bộ nhớ đỉnh mỗi worker không vượt ngân sách
+def plan_memory(op, n_alphas, memory_budget_mb=None, precision="auto"):
+    """
+    precision: "float64", "float32" hoặc "auto" (ưu tiên float64, chỉ hạ xuống float32
+    khi float64 không chứa được cả khối alpha trong ngân sách).
+    Trả về (dtype, batch_size); batch_size=None nghĩa là không cần chia khối.
+    Ước lượng: toán tử + STATE_BUFFERS ma trận n×k (X và các bộ đệm n×k của BatchBuffers)
+    + EDGE_BUFFERS ma trận nnz×k (hiệu theo cạnh của EdgeFold.sums).
+    """
+    candidates = ["float64", "float32"] if precision == "auto" else [precision]
+    if memory_budget_mb is None:
+        return np.dtype(candidates[0]), None
+
+    budget = memory_budget_mb * 1024 ** 2
+    best = None
+    for name in candidates:
+        dtype = np.dtype(name)
+        op_bytes = op.nbytes(dtype)
+        per_column = (STATE_BUFFERS * op.n + EDGE_BUFFERS * op.M.nnz) * dtype.itemsize
+        width = int((budget - op_bytes) // per_column)
+        if width >= n_alphas:
+            return dtype, None
+        if best is None or width > best[1]:
+            best = (dtype, width)
+
+    dtype, width = best
+    if width < 1:
+        raise MemoryError(
+            f"Ngân sách {memory_budget_mb} MB không đủ cho toán tử mạng ({op.n} node, {op.M.nnz} cạnh)"
+        )
+    return dtype, width
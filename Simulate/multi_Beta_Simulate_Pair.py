@@ -2,32 +2,24 @@
 # ✅ Gán alpha là target node, beta là driver node (đọc từ file driver-target)
 
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import numpy as np
-import pandas as pd
-import networkx as nx
 from tqdm import tqdm
 from joblib import Parallel, delayed, cpu_count
-from ast import literal_eval
+from Simulate.Sparse_Engine import build_network_operator, attach_betas, iterate_to_convergence
+from Simulate.Network_Loader import import_network
+from Simulate.Pair_Set import iter_pairs, resolve_drivers, PAIRSET_SUFFIX
+from Simulate.Checkpoint import ResultCheckpoint, checkpoint_path, compact_results
 
 INF = 10000
 EPSILON = 0.1
 DELTA = 0.2
 MAX_ITER = 10
 TOL = 1e-3
+ENGINE = "sparse"  # "sparse" (CSR) hoặc "dense" (vòng lặp Python gốc)
 
-# ✅ B1: Đọc mạng từ file
-def import_network(file_path):
-    with open(file_path, "r") as f:
-        data = f.readlines()[1:]
-    G = nx.DiGraph()
-    for line in data:
-        from_node, to_node, direction, weight = line.strip().split("\t")
-        direction = int(direction)
-        weight = float(weight)
-        G.add_edge(from_node, to_node, weight=weight)
-        if direction == 0:
-            G.add_edge(to_node, from_node, weight=weight)
-    return G
+# ✅ B1: Đọc mạng từ file → import_network (Simulate/Network_Loader.py)
 
 # ✅ B2: Ma trận kề và hàng xóm
 def build_adjacency(G, node_order):
@@ -53,6 +45,14 @@ def update_states_multi_beta(x, A, neighbors, beta_indices, beta_weights, fixed_
         x_new[u] = x[u] + influence + beta_influence
     return x_new
 
+# ✅ B4b: Mô phỏng cạnh tranh ngoài bằng engine CSR (không clip, giống bản dense)
+def simulate_competition_sparse(op, alpha_nodes, beta_nodes):
+    attach_idx, attach_count = attach_betas(op, beta_nodes)
+    x = np.zeros(op.n)
+    for a in alpha_nodes:
+        x[op.node_index[a]] = 1
+    return iterate_to_convergence(op, x, attach_idx, attach_count, EPSILON, DELTA, MAX_ITER, TOL, clip=None)
+
 # ✅ B4: Mô phỏng cạnh tranh ngoài
 def simulate_competition(G, alpha_nodes, beta_nodes):
     node_order = list(G.nodes()) + [f"Beta{i}" for i in range(len(beta_nodes))]
@@ -105,21 +105,32 @@ def compute_total_support(x_state, alpha_indices):
 def process_target_driver(G, targets, drivers):
     node_order = list(G.nodes())
     results = []
+    # ✅ Toán tử CSR dựng 1 lần cho cả dòng, Beta gắn dạng lớp phủ
+    op = build_network_operator(G, node_order) if ENGINE == "sparse" else None
 
     for alpha in targets:
-        x_state = simulate_competition(G, [alpha], drivers)
+        if op is not None:
+            x_state = simulate_competition_sparse(op, [alpha], drivers)
+        else:
+            x_state = simulate_competition(G, [alpha], drivers)
         alpha_idx = node_order.index(alpha)
         support = compute_total_support(x_state, [alpha_idx])
         results.append({"Alpha_Node": alpha, "Total_Support": support[alpha_idx]})
 
     return results
 
+# ✅ B6b: Task song song cho 1 dòng, gắn kèm chỉ số dòng (kết quả về không theo thứ tự);
+# ✅ driver của file .pairset chỉ bung thành tên node tại worker
+def process_row(row_idx, G, targets, drivers):
+    return row_idx, process_target_driver(G, targets, resolve_drivers(drivers))
+
 # ✅ B7: Main
 if __name__ == "__main__":
     input_folder = "data_2"
     pair_folder = "driver_nodes_2"
     output_folder = "output_multi_beta_pair_cpu"
     os.makedirs(output_folder, exist_ok=True)
+    params = {"EPSILON": EPSILON, "DELTA": DELTA, "MAX_ITER": MAX_ITER, "TOL": TOL, "engine": ENGINE}
 
     for file in os.listdir(input_folder):
         if not file.endswith(".txt"):
@@ -128,18 +139,32 @@ if __name__ == "__main__":
         base = os.path.splitext(file)[0]
 
         G = import_network(path)
-        pair_file = os.path.join(pair_folder, f"{base}_pairs.csv")
-        pairs_df = pd.read_csv(pair_file)
-
-        results = Parallel(n_jobs=cpu_count() // 2)(
-            delayed(process_target_driver)(
-                G,
-                literal_eval(row["Target_Nodes"]),
-                literal_eval(row["Driver_Nodes"])
-            ) for _, row in tqdm(pairs_df.iterrows(), total=len(pairs_df), desc=f"🔁 {base}")
-        )
-
-        all_results = [item for sublist in results for item in sublist]
-        df = pd.DataFrame(all_results)
+        # ✅ Ưu tiên file cặp nhị phân (.pairset, xem Pair_Set.py) nếu đã chuyển đổi, không thì CSV
+        pair_file = os.path.join(pair_folder, f"{base}_pairs{PAIRSET_SUFFIX}")
+        if not os.path.exists(pair_file):
+            pair_file = os.path.join(pair_folder, f"{base}_pairs.csv")
+
+        # ✅ Kết quả từng (dòng, alpha) ghi nối ngay khi xong; chạy lại sẽ bỏ qua phần đã có
+        checkpoint = ResultCheckpoint(checkpoint_path(output_folder, path, pair_file, params))
+        done = checkpoint.done()
+        # ✅ Đọc từng dòng; chỉ giữ target (thứ tự kết quả) và driver dạng mã hoá của file .pairset
+        row_targets, tasks = [], []
+        for i, drivers, targets in iter_pairs(pair_file, lazy_drivers=True):
+            row_targets.append((i, targets))
+            todo = [alpha for alpha in targets if (i, alpha) not in done]
+            if todo:
+                tasks.append((i, todo, drivers))
+
+        try:
+            results = Parallel(n_jobs=max(1, cpu_count() // 2), return_as="generator_unordered")(
+                delayed(process_row)(i, G, todo, drivers) for i, todo, drivers in tasks
+            )
+            for i, row_results in tqdm(results, total=len(tasks), desc=f"🔁 {base}"):
+                for r in row_results:
+                    checkpoint.append(i, r["Alpha_Node"], r["Total_Support"])
+        finally:
+            checkpoint.close()
+
+        df = compact_results(checkpoint.done(), row_targets)
         df.to_csv(os.path.join(output_folder, base + "_cpu_result.csv"), index=False)
         print(f"✅ Đã lưu kết quả vào {output_folder}/{base}_cpu_result.csv")
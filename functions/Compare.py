@@ -1,6 +1,19 @@
 # ✅ match_with_oncokb_pubmed(df, top_n=None) — đối chiếu OncoKB & PubMed cho tk_app
-import pandas as pd
+# ✅ Mỗi bảng tham chiếu có 1 chỉ mục băm (Symbol / Alias → dòng đầu tiên khớp) dựng 1 lần;
+# ✅ cả danh sách gen được đối chiếu bằng phép join (Series.map) thay vì quét toàn bảng cho từng gen.
+# ✅ Bảng tham chiếu chỉ được nạp ở lần dùng đầu tiên (import module không đọc Excel), từ snapshot nhị phân
+# ✅ cạnh file gốc (.{tên file}.{hash}.ocdm/) khi còn khớp mtime / hash; tạo sẵn snapshot bằng
+# ✅ functions/convert_excel_to_csv.py.
+import glob
+import json
 import os
+import pickle
+import shutil
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pandas as pd
+import numpy as np
+from Simulate.Network_Loader import file_hash, _cache_dir, CACHE_SUFFIX
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -8,69 +21,182 @@ oncokb_file = os.path.join(BASE_DIR, "..", "Cancer gene OncoKB30012025.xlsx")
 pubmed_file = os.path.join(BASE_DIR, "..", "Clinical.xlsx")
 mart_file = os.path.join(BASE_DIR, "..", "mart_biotool.txt")
 
-oncokb = pd.read_excel(oncokb_file)
-pubmed = pd.read_excel(pubmed_file)
-mart = pd.read_csv(mart_file, sep="\t")
+REFERENCE_FILES = {"oncokb": oncokb_file, "pubmed": pubmed_file, "mart": mart_file}
+GENE_COLUMNS = {"oncokb": ('Hugo Symbol', 'Gene Aliases'),
+                "pubmed": ('Symbol', 'Alias symbol'),
+                "mart": ('Gene name', None)}
+SNAPSHOT_FILE = "table.pkl"
+STAMP_FILE = "source.json"
+
+OUTPUT_COLUMNS = ["Alpha_Node", "Ensembl ID", "Symbol", "Alias symbol", "Total_Support",
+                  "Is Oncogene", "Is Tumor Suppressor Gene", "In OncoKB", "PubmedID"]
+
+# ✅ Series tên → vị trí dòng (giữ vị trí nhỏ nhất khi 1 tên xuất hiện nhiều lần)
+def _first_positions(names):
+    index = pd.Index(names.to_numpy(dtype=object), dtype=object)
+    positions = pd.Series(names.index.to_numpy(), index=index)
+    return positions[~index.duplicated()]
+
+class GeneIndex:
+    """
+    Tra gen trong 1 bảng tham chiếu: khớp cột symbol trước, rồi tới 1 tên trong cột alias ("A, B, C"),
+    luôn lấy dòng đầu tiên khớp như bản quét từng gen trước đây.
+    """
+    def __init__(self, table, symbol_col, alias_col=None):
+        self.table = table.reset_index(drop=True)
+        self.symbol = _first_positions(self.table[symbol_col].dropna())
+        self.alias = None
+        if alias_col is not None:
+            aliases = self.table[alias_col].fillna('').str.split(', ').explode()
+            self.alias = _first_positions(aliases.dropna())
+
+    # ✅ Vị trí dòng khớp cho từng gen, -1 nếu không khớp
+    def lookup(self, genes):
+        genes = pd.Series(list(genes), dtype=object)
+        positions = genes.map(self.symbol)
+        if self.alias is not None:
+            positions = positions.fillna(genes.map(self.alias))
+        return positions.fillna(-1).to_numpy(dtype=np.int64)
+
+    # ✅ Giá trị cột tại các vị trí (missing cho vị trí -1)
+    def take(self, positions, column, missing=""):
+        values = self.table[column].to_numpy(dtype=object)
+        return [values[p] if p >= 0 else missing for p in positions.tolist()]
+
+# ✅ Đọc file gốc (Excel: sheet đầu tiên, còn lại: bảng phân cách tab)
+def read_source(path):
+    if path.endswith(".xlsx"):
+        return pd.read_excel(path)
+    return pd.read_csv(path, sep="\t")
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "pandas": pd.__version__}
+
+def _write_stamp(snapshot, stamp):
+    with open(os.path.join(snapshot, STAMP_FILE), "w") as f:
+        json.dump(stamp, f)
+
+def _snapshots(path):
+    folder, base = os.path.split(os.path.abspath(path))
+    return glob.glob(os.path.join(folder, glob.escape(f".{base}.") + "*" + CACHE_SUFFIX))
+
+# ✅ Snapshot còn hợp lệ: khớp size + mtime thì dùng ngay; mtime đổi nhưng hash nội dung vẫn khớp
+# ✅ (checkout / copy lại file) thì cập nhật stamp và dùng tiếp; snapshot của bản pandas khác thì bỏ qua
+def load_snapshot(path):
+    stamp = _source_stamp(path)
+    for snapshot in _snapshots(path):
+        try:
+            with open(os.path.join(snapshot, STAMP_FILE)) as f:
+                saved = json.load(f)
+            if saved.get("pandas") != stamp["pandas"]:
+                continue
+            if saved != stamp:
+                if snapshot != _cache_dir(path, file_hash(path)):
+                    continue
+                _write_stamp(snapshot, stamp)
+            return pd.read_pickle(os.path.join(snapshot, SNAPSHOT_FILE))
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            continue
+    return None
+
+# ✅ Đọc file gốc và ghi snapshot mới (xoá snapshot cũ của cùng file); thư mục chỉ đọc thì chỉ trả về bảng
+def build_snapshot(path):
+    df = read_source(path)
+    snapshot = _cache_dir(path, file_hash(path))
+    try:
+        for old in _snapshots(path):
+            shutil.rmtree(old, ignore_errors=True)
+        tmp = snapshot + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        df.to_pickle(os.path.join(tmp, SNAPSHOT_FILE))
+        _write_stamp(tmp, _source_stamp(path))
+        os.replace(tmp, snapshot)
+    except OSError:
+        pass
+    return df
+
+_tables = {}
+_indexes = {}
+
+# ✅ Bảng tham chiếu theo tên ("oncokb" / "pubmed" / "mart"), nạp 1 lần ở lần dùng đầu tiên
+def load_table(name, use_snapshot=True):
+    if name not in _tables:
+        path = REFERENCE_FILES[name]
+        df = load_snapshot(path) if use_snapshot else None
+        if df is None:
+            df = build_snapshot(path) if use_snapshot else read_source(path)
+        _tables[name] = df
+    return _tables[name]
+
+def gene_index(name):
+    if name not in _indexes:
+        _indexes[name] = GeneIndex(load_table(name), *GENE_COLUMNS[name])
+    return _indexes[name]
+
+# ✅ Nạp sẵn mọi bảng + chỉ mục (vd. trước khi đo thời gian đối chiếu)
+def load_reference():
+    for name in REFERENCE_FILES:
+        gene_index(name)
+
+# ✅ Giữ tên cũ ở cấp module (Compare.oncokb, Compare.pubmed_index, ...) nhưng chỉ nạp khi được truy cập
+def __getattr__(attr):
+    if attr in REFERENCE_FILES:
+        return load_table(attr)
+    if attr.endswith("_index") and attr[:-len("_index")] in REFERENCE_FILES:
+        return gene_index(attr[:-len("_index")])
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
 
 def get_pubmed_info(gene):
-    symbol_match = pubmed[pubmed['Symbol'] == gene]
-    alias_match = pubmed[pubmed['Alias symbol'].fillna('').str.split(', ').apply(lambda x: gene in x)]
-    if not symbol_match.empty:
-        return symbol_match.iloc[0]['PubmedID']
-    elif not alias_match.empty:
-        return alias_match.iloc[0]['PubmedID']
-    else:
-        return ""
+    index = gene_index("pubmed")
+    return index.take(index.lookup([gene]), 'PubmedID')[0]
 
 def get_ensembl_id(gene, aliases):
-    symbol_match = pubmed[pubmed['Symbol'] == gene]
-    alias_match = pubmed[pubmed['Alias symbol'].fillna('').str.split(', ').apply(lambda x: gene in x)]
-    if not symbol_match.empty:
-        return symbol_match.iloc[0]['Ensembl ID']
-    elif not alias_match.empty:
-        return alias_match.iloc[0]['Ensembl ID']
-    else:
-        for name in [gene] + aliases:
-            mart_match = mart[mart['Gene name'] == name]
-            if not mart_match.empty:
-                return mart_match.iloc[0]['Gene stable ID']
-        return ""
+    return _ensembl_ids([gene], [aliases])[0]
 
 def check_oncokb(gene):
-    symbol_match = oncokb[oncokb['Hugo Symbol'] == gene]
-    alias_match = oncokb[oncokb['Gene Aliases'].fillna('').str.split(', ').apply(lambda x: gene in x)]
-    if not symbol_match.empty:
-        row = symbol_match.iloc[0]
-        return row['Hugo Symbol'], row['Gene Aliases'], row['Is Oncogene'], row['Is Tumor Suppressor Gene'], True
-    elif not alias_match.empty:
-        row = alias_match.iloc[0]
-        return row['Hugo Symbol'], row['Gene Aliases'], row['Is Oncogene'], row['Is Tumor Suppressor Gene'], True
-    else:
+    index = gene_index("oncokb")
+    pos = index.lookup([gene])[0]
+    if pos < 0:
         return gene, "", "", "", False
+    row = index.table.iloc[pos]
+    return row['Hugo Symbol'], row['Gene Aliases'], row['Is Oncogene'], row['Is Tumor Suppressor Gene'], True
+
+# ✅ Ensembl ID: dòng PubMed khớp symbol (hoặc alias), không có thì tên đầu tiên trong [gene] + aliases có trong mart
+def _ensembl_ids(genes, alias_lists):
+    pubmed_index, mart_index = gene_index("pubmed"), gene_index("mart")
+    ids = pubmed_index.take(pubmed_index.lookup(genes), 'Ensembl ID', None)
+    missing = [i for i, value in enumerate(ids) if value is None]
+    if missing:
+        names = pd.Series([[genes[i]] + list(alias_lists[i]) for i in missing], index=missing).explode()
+        positions = names.map(mart_index.symbol).dropna()
+        first = positions.groupby(level=0, sort=False).first()
+        stable_ids = mart_index.take(first.to_numpy(dtype=np.int64), 'Gene stable ID')
+        found = dict(zip(first.index.tolist(), stable_ids))
+        for i in missing:
+            ids[i] = found.get(i, "")
+    return ids
 
 def match_with_oncokb_pubmed(df, top_n=None):
     if top_n:
         df = df.sort_values(by="Total_Support", ascending=False).head(top_n)
 
-    output = []
-    for _, row in df.iterrows():
-        gene = row['Alpha_Node']
-        total_support = row['Total_Support']
-
-        symbol, alias, is_oncogene, is_tsg, in_oncokb = check_oncokb(gene)
-        pubmed_id = get_pubmed_info(gene)
-        ensembl_id = get_ensembl_id(symbol, alias.split(', ') if isinstance(alias, str) else [])
-
-        output.append({
-            "Alpha_Node": gene,
-            "Ensembl ID": ensembl_id,
-            "Symbol": symbol,
-            "Alias symbol": alias,
-            "Total_Support": total_support,
-            "Is Oncogene": is_oncogene,
-            "Is Tumor Suppressor Gene": is_tsg,
-            "In OncoKB": in_oncokb,
-            "PubmedID": pubmed_id
-        })
-
-    return pd.DataFrame(output)
+    oncokb_index, pubmed_index = gene_index("oncokb"), gene_index("pubmed")
+    genes = df['Alpha_Node'].tolist()
+    onco = oncokb_index.lookup(genes)
+    in_oncokb = onco >= 0
+    symbols = [s if ok else gene for s, ok, gene in zip(oncokb_index.take(onco, 'Hugo Symbol'), in_oncokb, genes)]
+    aliases = oncokb_index.take(onco, 'Gene Aliases')
+    alias_lists = [alias.split(', ') if isinstance(alias, str) else [] for alias in aliases]
+
+    return pd.DataFrame({
+        "Alpha_Node": genes,
+        "Ensembl ID": _ensembl_ids(symbols, alias_lists),
+        "Symbol": symbols,
+        "Alias symbol": aliases,
+        "Total_Support": df['Total_Support'].tolist(),
+        "Is Oncogene": oncokb_index.take(onco, 'Is Oncogene'),
+        "Is Tumor Suppressor Gene": oncokb_index.take(onco, 'Is Tumor Suppressor Gene'),
+        "In OncoKB": in_oncokb.tolist(),
+        "PubmedID": pubmed_index.take(pubmed_index.lookup(genes), 'PubmedID'),
+    }, columns=OUTPUT_COLUMNS)
@@ -1,18 +1,52 @@
-# 📌 Chuyển đổi file Excel OncoKB sang CSV để tiện xử lý
-# 📥 Input: Cancer gene OncoKB30012025.xlsx
-# 📤 Output: Cancer gene OncoKB30012025.csv
+# 📌 Tạo snapshot nhị phân cho các bảng tham chiếu của Compare.py (OncoKB, Clinical, mart_biotool)
+#    để app chỉ phải memory-load pickle thay vì parse Excel ở lần đối chiếu đầu tiên;
+#    vẫn chuyển được file Excel sang CSV như trước (--csv)
+# 📥 Input: Cancer gene OncoKB30012025.xlsx, Clinical.xlsx, mart_biotool.txt (hoặc file Excel bất kỳ với --csv)
+# 📤 Output: .<tên file>.<hash>.ocdm/ cạnh file gốc (hoặc <tên file>.csv với --csv)
+#
+#   python functions/convert_excel_to_csv.py                  # snapshot cho mọi bảng (bỏ qua bảng còn hợp lệ)
+#   python functions/convert_excel_to_csv.py --force          # tạo lại toàn bộ snapshot
+#   python functions/convert_excel_to_csv.py --csv ../HGRN.xlsx
 
-import pandas as pd
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import time
+import pandas as pd
+from functions.Compare import REFERENCE_FILES, load_snapshot, build_snapshot
 
-# Đường dẫn tới file Excel (đã upload sẵn)
-excel_file = "../HGRN.xlsx"
+# ✅ Excel → CSV cùng tên (chỉ lấy sheet đầu tiên)
+def excel_to_csv(excel_file):
+    df = pd.read_excel(excel_file)
+    csv_file = os.path.splitext(excel_file)[0] + ".csv"
+    df.to_csv(csv_file, index=False)
+    return csv_file
 
-# Đọc dữ liệu từ Excel (chỉ lấy sheet đầu tiên)
-df = pd.read_excel(excel_file)
+# ✅ Snapshot cho từng bảng tham chiếu; trả về {tên bảng: số dòng}
+def build_reference_snapshots(force=False):
+    rows = {}
+    for name, path in REFERENCE_FILES.items():
+        t0 = time.perf_counter()
+        df = None if force else load_snapshot(path)
+        action = "còn hợp lệ"
+        if df is None:
+            df = build_snapshot(path)
+            action = "đã tạo"
+        rows[name] = len(df)
+        print(f"✅ {name}: {os.path.basename(path)} ({len(df)} dòng) — snapshot {action}, {time.perf_counter() - t0:.2f}s")
+    return rows
 
-# Xuất ra file CSV cùng tên
-csv_file = os.path.splitext(excel_file)[0] + ".csv"
-df.to_csv(csv_file, index=False)
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tạo snapshot bảng tham chiếu cho Compare.py / chuyển Excel sang CSV")
+    parser.add_argument("--force", action="store_true", help="tạo lại snapshot kể cả khi còn hợp lệ")
+    parser.add_argument("--csv", nargs="+", default=None, metavar="EXCEL", help="chuyển file Excel sang CSV")
+    return parser.parse_args(argv)
 
-print(f"✅ Đã chuyển đổi thành công! File CSV lưu tại: {csv_file}")
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.csv:
+        for excel_file in args.csv:
+            print(f"✅ Đã chuyển đổi thành công! File CSV lưu tại: {excel_to_csv(excel_file)}")
+    else:
+        build_reference_snapshots(force=args.force)
@@ -0,0 +1,68 @@
+# ✅ merged_csv.py — Gộp kết quả các shard Phase 2 (Simulate/Sharding.py) thành 1 file Alpha_Node, Total_Support
+# ✅ Kiểm tra: đủ N shard, shard nào cũng đã chạy xong, mọi (dòng, alpha) của file cặp đều có kết quả,
+# ✅ không shard nào ghi ngoài phần của mình → kết quả trùng với lần chạy 1 tiến trình.
+#
+# ✅ Dùng:
+#   python functions/merged_csv.py pairs.csv shards/ -o result.csv
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+from Simulate.Checkpoint import read_parts, compact_results
+from Simulate.Network_Loader import file_hash
+from Simulate.Phase2_Multi_Beta_Simulate_Pair import read_pairs
+from Simulate.Sharding import read_manifests, shard_assignment, shard_label
+
+def merge_shards(pair_csv_path, shard_dir, output_csv=None, run_key=None):
+    pair_hash = file_hash(pair_csv_path)
+    manifests = [m for m in read_manifests(shard_dir, pair_csv_path)
+                 if m["pair_hash"] == pair_hash and (run_key is None or m["run_key"] == run_key)]
+    if not manifests:
+        raise FileNotFoundError(f"Không có manifest shard nào của {pair_csv_path} trong {shard_dir}")
+
+    # ✅ Cùng 1 lần chạy (mạng + tham số) và cùng số shard
+    run_keys = {m["run_key"] for m in manifests}
+    if len(run_keys) > 1:
+        raise ValueError(f"Thư mục có kết quả của nhiều lần chạy khác nhau {sorted(run_keys)}; chỉ định run_key")
+    counts = {m["n_shards"] for m in manifests}
+    if len(counts) > 1:
+        raise ValueError(f"Các shard không cùng số shard: {sorted(counts)}")
+    n_shards = counts.pop()
+    by_index = {m["shard_index"]: m for m in manifests}
+    missing = [shard_label(i, n_shards) for i in range(n_shards) if i not in by_index]
+    if missing:
+        raise ValueError(f"Thiếu shard: {', '.join(missing)}")
+    incomplete = [shard_label(i, n_shards) for i, m in sorted(by_index.items()) if not m["complete"]]
+    if incomplete:
+        raise ValueError(f"Shard chưa chạy xong: {', '.join(incomplete)}")
+
+    # ✅ Gộp kết quả, kiểm tra từng (dòng, alpha) đúng shard và không thiếu
+    rows = read_pairs(pair_csv_path)
+    assignment = shard_assignment(rows, n_shards)
+    done = {}
+    for index, manifest in sorted(by_index.items()):
+        for key, support in read_parts(os.path.join(shard_dir, manifest["parts_file"])).items():
+            if assignment.get(key) != index:
+                raise ValueError(f"{manifest['parts_file']}: (dòng {key[0]}, {key[1]}) không thuộc shard này")
+            done[key] = support
+    absent = [key for key in assignment if key not in done]
+    if absent:
+        raise ValueError(f"Thiếu {len(absent)} kết quả, ví dụ (dòng {absent[0][0]}, {absent[0][1]})")
+
+    df = compact_results(done, [(row_idx, targets) for row_idx, _, targets in rows])
+    if output_csv:
+        df.to_csv(output_csv, index=False)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gộp kết quả các shard Phase 2")
+    parser.add_argument("pair_csv_path")
+    parser.add_argument("shard_dir")
+    parser.add_argument("-o", "--output", default=None, help="mặc định: <pair>_cpu_result.csv")
+    parser.add_argument("--run-key", default=None, help="chọn 1 lần chạy khi thư mục có nhiều lần chạy")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.pair_csv_path)[0] + "_cpu_result.csv"
+    df = merge_shards(args.pair_csv_path, args.shard_dir, output, args.run_key)
+    print(f"✅ Đã gộp {len(df)} kết quả vào {output}")